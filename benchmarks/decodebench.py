@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+'''
+decodebench.py - Compare sensor packet decode throughput for packet 100
+
+Times the table-driven decoder against a re-implementation of the original
+per-byte path (bytes -> list of chr() strings -> pop() -> encode('utf8') ->
+struct.unpack) on the same 80-byte packet.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import os
+import sys
+import struct
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from breezycreate2 import _sensorPacketDecoder, _SENSOR_PACKETS, _SENSOR_BITS, _Config, SensorState
+from breezycreate2.constants import PACKET_LENGTHS
+
+ITERATIONS = 20000
+
+def legacy_decode_100(raw, sensor_data):
+    '''
+    Decodes packet 100 the way the original if/elif decoder did.
+    '''
+    byte_data = [chr(x) for x in list(raw)]
+    for packet_id in range(58, 6, -1):
+        fmt, key = _SENSOR_PACKETS[packet_id]
+        if fmt in ('h', 'H'):
+            low, high = byte_data.pop(), byte_data.pop()
+            value = ord(high) << 8 | ord(low)
+        elif fmt == '2x':
+            byte_data.pop(), byte_data.pop()
+            value = None
+        else:
+            value = struct.unpack('B', byte_data.pop().encode('utf8'))[0]
+            if fmt == '?':
+                value = bool(value)
+        if key in _SENSOR_BITS:
+            value = dict((name, bool(value & mask)) for name, mask in _SENSOR_BITS[key])
+        if key is not None:
+            sensor_data[key] = value
+    return sensor_data
+
+def report(name, seconds):
+    print('%-8s %8.2f usec/packet  %10.0f packets/sec' % (name, 1e6 * seconds / ITERATIONS, ITERATIONS / seconds))
+
+if __name__ == '__main__':
+
+    config = _Config()
+    config.load()
+    decoder = _sensorPacketDecoder(PACKET_LENGTHS)
+    sensor_data = dict(config.data['sensor data'])
+    sensor_state = SensorState()
+
+    # The old path mangles bytes >= 0x80, so keep the sample below that
+    raw = bytes(bytearray(x & 0x7F for x in bytearray(os.urandom(80))))
+
+    legacy = timeit.timeit(lambda: legacy_decode_100(raw, sensor_data), number=ITERATIONS)
+    table = timeit.timeit(lambda: decoder.decode_packet(100, raw, sensor_state), number=ITERATIONS)
+
+    report('legacy', legacy)
+    report('table', table)
+    print('speedup  %8.1fx' % (legacy / table))
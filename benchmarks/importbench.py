@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+'''
+importbench.py - Time importing breezycreate2 and loading its config
+
+Runs "python -X importtime" in fresh interpreters, and reports the median
+cumulative import time of breezycreate2 and of its slowest imports, plus the
+time to load the config the first time and again once it is cached.
+
+    importbench.py [--runs N]
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Prints the first and the cached config load times, in usec
+LOAD = '''
+import time
+import breezycreate2
+for _ in range(2):
+    start = time.perf_counter()
+    breezycreate2._Config().load()
+    print(1e6 * (time.perf_counter() - start))
+'''
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def run_once():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', LOAD], env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    # Lines look like "import time:       self |  cumulative | module"
+    imports = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                imports[module.strip()] = int(cumulative)
+    first, cached = [float(line) for line in process.stdout.split()]
+    return imports, first, cached
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Time importing breezycreate2')
+    parser.add_argument('--runs', type=int, default=9, help='fresh interpreters to run')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+
+    print('import breezycreate2      %8.1f msec' % (median([run[0]['breezycreate2'] for run in runs]) / 1e3))
+    print('first _Config().load()    %8.1f usec' % median([run[1] for run in runs]))
+    print('cached _Config().load()   %8.1f usec' % median([run[2] for run in runs]))
+    print('slowest imports (cumulative msec):')
+    slowest = sorted(runs[0][0].items(), key=lambda item: -item[1])[:8]
+    for module, _ in slowest:
+        print('  %-40s %8.1f' % (module, median([run[0].get(module, 0) for run in runs]) / 1e3))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+'''
+sensorbench.py - Latency benchmarks for the sensor and command paths
+
+Runs against the simulated Create2, so no robot is needed.  Measures
+get_packet() for every packet id, decode_packet() alone, SCI.send() for
+drive, song and LED commands, and the Robot getter loops (polled and
+streamed), reporting p50/p95/p99 latency and operations per second, and a
+histogram of each one's latencies in HISTOGRAM_BUCKETS.
+
+    sensorbench.py                          # print a report
+    sensorbench.py --json run.json          # ...and save it
+    sensorbench.py --compare old.json new.json --threshold 10
+
+With --compare, prints the change in p50 for every benchmark and exits with
+status 1 if any got slower by more than the threshold (percent).
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import argparse
+import bisect
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from breezycreate2 import Robot, SensorState
+from breezycreate2.constants import Opcode, PACKET_LENGTHS
+from breezycreate2.simulator import SimulatedCreate2
+
+# Upper bounds of the latency histogram buckets, in usec; the last bucket counts everything slower
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def measure(operation, iterations):
+    '''
+    Runs operation() iterations times; returns its latency stats in usec.
+    '''
+    operation()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'p50': 1e6 * percentile(samples, .50),
+        'p95': 1e6 * percentile(samples, .95),
+        'p99': 1e6 * percentile(samples, .99),
+        'ops_per_sec': iterations / sum(samples),
+        'histogram': histogram(samples),
+        }
+
+def histogram(ordered):
+    '''
+    Returns the number of latencies (sorted, in seconds) in each of HISTOGRAM_BUCKETS,
+    plus the number slower than the last.
+    '''
+    counts = []
+    start = 0
+    for bound in HISTOGRAM_BUCKETS:
+        end = bisect.bisect_right(ordered, bound / 1e6, start)
+        counts.append(end - start)
+        start = end
+    counts.append(len(ordered) - start)
+    return counts
+
+def run(iterations):
+
+    sim = SimulatedCreate2()
+    bot = Robot(transport=sim)
+    create2 = bot.robot
+    lengths = dict((packet_id, length) for packet_id, length in enumerate(PACKET_LENGTHS) if length)
+    results = {}
+
+    for packet_id in sorted(lengths):
+        results['get_packet/%d' % packet_id] = measure(lambda: create2.get_packet(packet_id), iterations)
+
+    state = SensorState()
+    for packet_id in sorted(lengths):
+        raw = bytes(bytearray(lengths[packet_id]))
+        results['decode_packet/%d' % packet_id] = measure(lambda: create2.decoder.decode_packet(packet_id, raw, state), iterations)
+
+    # Alternate the data so that the writer can't skip repeated commands
+    speeds = [(0, 100, 127, 255), (0, 200, 127, 255)]
+    digits = [(72, 73, 32, 32), (66, 89, 69, 32)]
+    counter = [0]
+    def alternate(commands):
+        counter[0] ^= 1
+        return commands[counter[0]]
+    results['send/drive'] = measure(lambda: create2.SCI.send(Opcode.DRIVE, alternate(speeds)), iterations)
+    results['send/drive_repeated'] = measure(lambda: create2.SCI.send(Opcode.DRIVE, speeds[0]), iterations)
+    results['send/digit_led_ascii'] = measure(lambda: create2.SCI.send(Opcode.DIGIT_LED_ASCII, alternate(digits)), iterations)
+    results['send/song'] = measure(lambda: create2.SCI.send(Opcode.SONG, (0, 4, 69, 16, 71, 16, 72, 16, 74, 32)), iterations)
+    sim.reset_input_buffer()
+
+    results['robot/getBumpers'] = measure(bot.getBumpers, iterations)
+    results['robot/getCliffSensors'] = measure(bot.getCliffSensors, iterations)
+    results['robot/getWallSensor'] = measure(bot.getWallSensor, iterations)
+
+    bot.startStream()
+    time.sleep(.1)
+    results['robot_streaming/getBumpers'] = measure(bot.getBumpers, iterations)
+    results['robot_streaming/getCliffSensors'] = measure(bot.getCliffSensors, iterations)
+    results['robot_streaming/getWallSensor'] = measure(bot.getWallSensor, iterations)
+    bot.close()
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'results': results,
+        }
+
+def report(run):
+    print('%-36s %10s %10s %10s %12s' % ('benchmark', 'p50 usec', 'p95 usec', 'p99 usec', 'ops/sec'))
+    for name, result in sorted(run['results'].items()):
+        print('%-36s %10.2f %10.2f %10.2f %12.0f' % (name, result['p50'], result['p95'], result['p99'], result['ops_per_sec']))
+    print()
+    labels = ['<=%d' % bound for bound in HISTOGRAM_BUCKETS] + ['>%d' % HISTOGRAM_BUCKETS[-1]]
+    print('%-36s %s' % ('latency histogram (usec)', ''.join('%7s' % label for label in labels)))
+    for name, result in sorted(run['results'].items()):
+        # Runs saved before the histogram was added don't have one
+        if 'histogram' in result:
+            print('%-36s %s' % (name, ''.join('%7d' % count for count in result['histogram'])))
+
+def compare(old, new, threshold):
+    '''
+    Prints the change in p50 latency for every benchmark in both runs; returns the regressions.
+    '''
+    regressions = []
+    print('%-36s %10s %10s %8s' % ('benchmark', 'old p50', 'new p50', 'change'))
+    for name in sorted(set(old['results']) & set(new['results'])):
+        before = old['results'][name]['p50']
+        after = new['results'][name]['p50']
+        change = 100. * (after - before) / before if before else 0.
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-36s %10.2f %10.2f %+7.1f%%%s' % (name, before, after, change, flag))
+    return regressions
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the BreezyCreate2 sensor and command paths')
+    parser.add_argument('--iterations', type=int, default=2000, help='timed runs per benchmark')
+    parser.add_argument('--json', help='save the results to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved runs')
+    parser.add_argument('--threshold', type=float, default=10., help='percent slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        exit(1 if compare(old, new, args.threshold) else 0)
+
+    results = run(args.iterations)
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
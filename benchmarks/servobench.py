@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+'''
+servobench.py - I2C transactions and bus time for a servo pose
+
+Runs the PCA9685 driver in breezycreate2.servos against a FakeBus that counts
+transactions and bytes, and estimates the time each would take on a 100 kHz
+I2C bus, for one pose of the eight ServoController servos written three ways:
+one register at a time (the old setPWM()), one block write per channel, and
+setServoPulses(), which writes runs of consecutive channels together.  Each
+is timed for a first pose, the same pose again (as when the joystick is held
+against a limit), and a pose with one servo moved; PCA9685 skips writes of
+values its registers already hold.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from breezycreate2.servos import PCA9685, FakeBus
+
+# I2C clock, and bits per byte on the wire (8 data + ACK)
+BUS_HZ = 100000
+BITS_PER_BYTE = 9
+
+# ServoController's channels, with the pulse widths of its starting pose
+POSE = {13: 1660, 12: 1010, 0: 870, 1: 1260, 7: 2280, 6: 1440, 15: 1520, 14: 1220}
+
+# The same, with the claw moved
+MOVED = dict(list(POSE.items()) + [(1, 1300)])
+
+def bus_seconds(bus):
+    # Bits on the wire, plus a start and a stop condition per transaction
+    return (BITS_PER_BYTE * bus.bytes + 2 * bus.transactions) / float(BUS_HZ)
+
+def register_at_a_time(pwm, pose):
+    for channel, pulse in pose.items():
+        off = int(pulse*4096/20000)
+        pwm.write(0x06+4*channel, 0)
+        pwm.write(0x07+4*channel, 0)
+        pwm.write(0x08+4*channel, off & 0xFF)
+        pwm.write(0x09+4*channel, off >> 8)
+
+def block_per_channel(pwm, pose):
+    for channel, pulse in pose.items():
+        pwm.setServoPulse(channel, pulse)
+
+def batched(pwm, pose):
+    pwm.setServoPulses(pose)
+
+if __name__ == '__main__':
+
+    print('%-20s %-16s %12s %8s %12s' % ('pose write', '', 'transactions', 'bytes', 'bus usec'))
+
+    results = {}
+    for name, write in (('register at a time', register_at_a_time),
+                        ('block per channel', block_per_channel),
+                        ('batched runs', batched)):
+        bus = FakeBus()
+        pwm = PCA9685(0x40, bus=bus)
+        for case, pose in (('first pose', POSE), ('same pose again', POSE), ('one servo moved', MOVED)):
+            bus.reset()
+            write(pwm, pose)
+            print('%-20s %-16s %12d %8d %12.0f' % (name, case, bus.transactions, bus.bytes, 1e6 * bus_seconds(bus)))
+        results[name] = bytes(bus.registers)
+
+    # Every way of writing the poses has to leave the same register values
+    assert len(set(results.values())) == 1
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+'''
+statebench.py - Memory and allocation cost of 100k packet 100 polls
+
+Decodes the same 80-byte packet 100 times into the old nested sensor_state
+dict (a fresh dict for every bitfield packet) and into a SensorState (raw
+ints updated in place), and reports time per poll, size of the state, and
+peak traced memory while polling.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from breezycreate2 import _sensorPacketDecoder, _SENSOR_DECODERS, _SENSOR_SLOTS, _SENSOR_BITS, SensorState
+
+POLLS = 100000
+
+# SensorState attribute -> old sensor_state key
+KEYS = dict((slot, key) for key, slot in _SENSOR_SLOTS.items())
+
+def decode_dict(raw, sensor_data):
+    '''
+    Decodes packet 100 into the old nested sensor_state dict.
+    '''
+    packer, slots = _SENSOR_DECODERS[100]
+    for slot, value in zip(slots, packer.unpack_from(raw)):
+        key = KEYS[slot]
+        if key in _SENSOR_BITS:
+            value = dict((name, bool(value & mask)) for name, mask in _SENSOR_BITS[key])
+        sensor_data[key] = value
+    return sensor_data
+
+def deep_size(obj):
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_size(value) for value in obj.values())
+    return sys.getsizeof(obj)
+
+def run(name, decode, state, size):
+    raw = os.urandom(80)
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        decode(raw, state)
+    elapsed = time.perf_counter() - start
+    # Tracing slows things down a lot, so measure memory in a second pass
+    tracemalloc.start()
+    for _ in range(POLLS):
+        decode(raw, state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-12s %7.2f usec/poll  state %5d bytes  peak %7d bytes' %
+          (name, 1e6 * elapsed / POLLS, size(state), peak))
+
+if __name__ == '__main__':
+
+    decoder = _sensorPacketDecoder({})
+
+    run('dict', decode_dict, SensorState().as_dict(), deep_size)
+    run('SensorState', lambda raw, state: decoder.decode_packet(100, raw, state), SensorState(), sys.getsizeof)
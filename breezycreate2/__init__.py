@@ -23,20 +23,46 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import json
 import serial
 import struct
 import warnings
 import time
-import pkg_resources
+import threading
+from breezycreate2.constants import Opcode, PACKET_LENGTHS, MIDI_TABLE, ASCII_TABLE
+
+# Packets needed by the Robot.get...() methods: bumps, cliffs, and wall signal
+_STREAM_PACKETS = (7, 9, 10, 11, 12, 27)
+
+# Seconds between the frames of a sensor stream
+_STREAM_PERIOD = .015
+
+# Create 2 wheel geometry, in mm, from the Open Interface spec
+_WHEEL_BASE = 235.0
+_WHEEL_DIAMETER = 72.0
+_COUNTS_PER_REV = 508.8
+
+# Commands that set a state on the robot, so a newer one replaces an older one
+_COALESCED_COMMANDS = (Opcode.DRIVE, Opcode.DRIVE_DIRECT, Opcode.DRIVE_PWM, Opcode.MOTORS,
+                       Opcode.MOTORS_PWM, Opcode.LED, Opcode.SCHEDULING_LED, Opcode.DIGIT_LED_RAW,
+                       Opcode.DIGIT_LED_ASCII)
+
+# Commands that change the OI mode or reset the robot, forgetting the state set above
+_RESET_COMMANDS = (Opcode.START, Opcode.RESET, Opcode.STOP, Opcode.BAUD, Opcode.SAFE, Opcode.FULL,
+                   Opcode.CLEAN, Opcode.MAX, Opcode.SPOT, Opcode.SEEK_DOCK, Opcode.POWER)
+
+def _packet_length(packet_id):
+    # The length of a sensor packet, or 0 if packet_id isn't one
+    return PACKET_LENGTHS[packet_id] if 0 <= packet_id < len(PACKET_LENGTHS) else 0
 
 class Robot(object):
 
-    def __init__(self, port='/dev/ttyACM0', baud=115200):
+    def __init__(self, port='/dev/ttyACM0', baud=115200, transport=None):
         '''
         Connects to the Create2 on the specified port at the specified baud rate.
+        A serial-port-like transport, such as a simulator.SimulatedCreate2, can
+        be passed in to use instead of a real serial port.
         '''
-        self.robot = _Create2(port, baud)
+        self.robot = _Create2(port, baud, transport=transport)
         self.robot.start()
         self.robot.full()
 
@@ -70,6 +96,35 @@ class Robot(object):
         '''
         self.robot.turn_clockwise(speed)
 
+    def startStream(self, packet_ids=_STREAM_PACKETS):
+        '''
+        Asks the robot to stream the specified sensor packets every 15 msec.
+        While streaming, the get...() methods return the latest streamed values
+        without talking to the robot.
+        '''
+        self.robot.start_stream(packet_ids)
+
+    def stopStream(self):
+        '''
+        Stops the sensor stream; the get...() methods go back to polling.
+        '''
+        self.robot.stop_stream()
+
+    def addSensorListener(self, listener):
+        '''
+        Has listener(sensor_state, timestamp, packet_ids) called every time new sensor
+        values come in, polled or streamed, where packet_ids are the packets that just
+        came in.  It runs on the stream's thread while the sensor state is locked, so
+        keep it quick and don't call the robot from it.
+        '''
+        self.robot.add_sensor_listener(listener)
+
+    def removeSensorListener(self, listener):
+        '''
+        Stops calling a listener added with addSensorListener().
+        '''
+        self.robot.remove_sensor_listener(listener)
+
     def getBumpers(self):
         '''
         Returns left,right bumper states as booleans.
@@ -77,9 +132,11 @@ class Robot(object):
 
         self._get_sensor_packet()
 
-        sensors = self.robot.sensor_state['wheel drop and bumps']
+        with self.robot.sensor_lock:
+
+            sensors = self.robot.sensor_state
 
-        return sensors['bump left'], sensors['bump right']
+            return sensors.bump_left, sensors.bump_right
 
     def getCliffSensors(self):
         '''
@@ -88,10 +145,12 @@ class Robot(object):
 
         self._get_sensor_packet()
 
-        return self.robot.sensor_state['cliff left'],\
-               self.robot.sensor_state['cliff front left'],\
-               self.robot.sensor_state['cliff front right'],\
-               self.robot.sensor_state['cliff right']
+        with self.robot.sensor_lock:
+
+            return self.robot.sensor_state.cliff_left,\
+                   self.robot.sensor_state.cliff_front_left,\
+                   self.robot.sensor_state.cliff_front_right,\
+                   self.robot.sensor_state.cliff_right
 
     def getWallSensor(self):
         '''
@@ -100,12 +159,18 @@ class Robot(object):
 
         self._get_sensor_packet()
 
-        return self.robot.sensor_state['wall signal']
+        with self.robot.sensor_lock:
+
+            return self.robot.sensor_state.wall_signal
 
     def _get_sensor_packet(self):
 
-        #Packet 100 contains all sensor data.
-        self.robot.get_packet(100)
+        # A running stream keeps the sensor state current for us
+        if self.robot.stream_reader is not None:
+            return
+
+        # One request for just the packets we report on, instead of all 80 bytes of packet 100
+        self.robot.query_list(_STREAM_PACKETS)
 
 class _Error(Exception):
     """Error"""
@@ -149,26 +214,178 @@ class _Config(object):
     """This class handles loading and saving config files that store the
         Opcodes and other useful dicts
     
+        The command and sensor code uses the same tables from constants.py, which
+        genconstants.py generates from config.json.
     """
     
     def __init__(self):
         self.fname = 'config.json'
-        self.data = None
+        self._data = None
+
+    @property
+    def data(self):
+        """ The config file's dicts, loaded the first time they are asked for.
+        """
+        if self._data is None:
+            self.load()
+        return self._data
     
     def load(self):
         """ Loads a Create2 config file, that holds various dicts of opcodes.
-        
+            The file is only read and parsed the first time; after that, every _Config
+            shares the same data, so treat it as read-only.
         """
-        self.data = json.loads(pkg_resources.resource_string('breezycreate2', self.fname).decode('utf8'))
+        if self.fname not in _config_cache:
+            _config_cache[self.fname] = _Config._parse(self.fname)
+        self._data = _config_cache[self.fname]
+    
+    @staticmethod
+    def _parse(fname):
+        # Imported here, so that importing the package doesn't pay for them; nothing else needs them
+        import json
+        try:
+            from importlib.resources import files
+        except ImportError: # Python < 3.9
+            from importlib.resources import read_text
+            text = read_text('breezycreate2', fname, encoding='utf8')
+        else:
+            text = files('breezycreate2').joinpath(fname).read_text(encoding='utf8')
+        return json.loads(text)
+
+# File name -> parsed data, so that each config file is parsed once per process
+_config_cache = {}
         
+class _CommandWriter(object):
+    """This class packs commands into a reusable buffer and writes them to the Create2.
+    
+        Commands are written as they are sent, except inside a 'with writer:' block, where
+        they are queued and written together with a single write() at the end of the block.
+        For the state-setting commands in coalesced (drive, LEDs, ...), a queued command is
+        replaced by a newer one with the same opcode, and a command identical to the last one
+        written is skipped.  Any opcode in resets forgets what was last written and ends the run
+        of queued commands that can be replaced, so coalescing never moves a command across a
+        mode change; forget() also forgets what was last written, for when the robot has
+        changed its state on its own.
+    """
+    
+    def __init__(self, write):
+        self.write = write
+        self.buffer = bytearray(64)
+        self.length = 0
+        self.batching = 0
+        self.coalesced = frozenset()
+        self.resets = frozenset()
+        # struct.Struct for each command length
+        self.packers = {}
+        # Coalesced opcode -> (offset, data) of its queued command
+        self.pending = {}
+        # Coalesced opcode -> data of its last written command
+        self.last_sent = {}
+        self.writes = 0
+        self.commands_sent = 0
+        self.bytes_sent = 0
+        self.commands_saved = 0
+        self.bytes_saved = 0
+    
+    def configure(self, coalesced, resets):
+        """Sets the opcodes that are coalesced, and the opcodes that reset the robot's state.
+        """
+        self.coalesced = frozenset(coalesced)
+        self.resets = frozenset(resets)
+        self.last_sent.clear()
+    
+    def __enter__(self):
+        self.batching += 1
+        return self
+    
+    def __exit__(self, *args):
+        self.batching -= 1
+        if not self.batching:
+            self.flush()
+    
+    def send(self, opcode, data, force=False):
+        """Queues a command, and writes it unless we are batching.  A command that can't be
+            packed (a byte out of range) raises struct.error and leaves the queue as it was.
+        
+            Arguments:
+                opcode: The opcode of the command
+                data: A tuple of data bytes, or None
+                force: Write the command even if it is the same as the last one written
+        """
+        if data is None:
+            data = ()
+        size = 1 + len(data)
+        coalesced = opcode in self.coalesced
+        if coalesced:
+            if opcode in self.pending:
+                # Overwrite the queued command in place
+                offset = self.pending[opcode][0]
+                self.pack(offset, opcode, data)
+                self.pending[opcode] = (offset, data)
+                self.commands_saved += 1
+                self.bytes_saved += size
+                return
+            if not force and self.last_sent.get(opcode) == data:
+                self.commands_saved += 1
+                self.bytes_saved += size
+                return
+        if self.length + size > len(self.buffer):
+            self.flush()
+            if size > len(self.buffer):
+                self.buffer.extend(bytearray(size))
+        self.pack(self.length, opcode, data)
+        if coalesced:
+            self.pending[opcode] = (self.length, data)
+        elif opcode in self.resets:
+            # Commands queued before the reset stay ahead of it, and are neither replaced by
+            # the ones after it nor remembered as written, since the robot may ignore them
+            self.pending.clear()
+            self.last_sent.clear()
+        self.length += size
+        self.commands_sent += 1
+        if not self.batching:
+            self.flush()
+    
+    def forget(self):
+        """Forgets what was last written, so that the next command of every kind is written.
+        """
+        self.last_sent.clear()
+    
+    def pack(self, offset, opcode, data):
+        size = 1 + len(data)
+        if size not in self.packers:
+            self.packers[size] = struct.Struct('%dB' % size)
+        # Pack the whole command before copying it in, so a bad byte can't leave half of it in the buffer
+        try:
+            command = self.packers[size].pack(opcode, *data)
+        except struct.error:
+            # Not all ints; convert them the slow way
+            command = self.packers[size].pack(int(opcode), *[int(b) for b in data])
+        self.buffer[offset:offset+size] = command
+    
+    def flush(self):
+        """Writes any queued commands to the Create2 with one write().
+        """
+        if not self.length:
+            return
+        with memoryview(self.buffer) as view:
+            self.write(view[:self.length])
+        self.writes += 1
+        self.bytes_sent += self.length
+        self.length = 0
+        for opcode, (_, data) in self.pending.items():
+            self.last_sent[opcode] = data
+        self.pending.clear()
+
+
 class _SerialCommandInterface(object):
     """This class handles sending commands to the Create2.
     
     """
 
-    def __init__(self, com, baud):
+    def __init__(self, com, baud, ser=None):
 
-        self.ser = serial.Serial()
+        self.ser = ser if ser is not None else serial.Serial()
         self.ser.port = com
         self.ser.baudrate = baud
         if self.ser.isOpen(): 
@@ -176,21 +393,17 @@ class _SerialCommandInterface(object):
             self.ser.close()
         self.ser.open()
         print("connected")
+        self.writer = _CommandWriter(self.ser.write)
     
-    def send(self, opcode, data):
-        #First thing to do is convert the opcode to a tuple.
-        temp_opcode = (opcode,)
-        bytes = None
-        
-        if data == None:
-            #Sometimes opcodes don't need data. Since we can't add
-            # a None type to a tuple, we have to make this check.
-            bytes = temp_opcode
-        else:
-            #Add the opcodes and data together
-            bytes = temp_opcode + data
-        bytes = tuple([int(b) for b in bytes])
-        self.ser.write(struct.pack('B' * len(bytes), *bytes))
+    def send(self, opcode, data, force=False):
+        """Sends a command to the robot; see _CommandWriter.send().
+        """
+        self.writer.send(opcode, data, force)
+    
+    def batch(self):
+        """Returns a context manager that queues commands and writes them together at its end.
+        """
+        return self.writer
     
     def Read(self, num_bytes):
         """Read a string of 'num_bytes' bytes from the robot.
@@ -198,6 +411,8 @@ class _SerialCommandInterface(object):
             Arguments:
                 num_bytes: The number of bytes we expect to read.
         """
+        # Make sure a queued sensor request goes out before we wait for its answer
+        self.writer.flush()
         #logging.debug('Attempting to read %d bytes from SCI port.' % num_bytes)
         data = self.ser.read(num_bytes)
         #logging.debug('Read %d bytes from SCI port.' % len(data))
@@ -207,6 +422,28 @@ class _SerialCommandInterface(object):
             raise _ROIFailedToReceiveError('Error reading from SCI port. Wrong data length.')
         return data
     
+    def ReadInto(self, buffer):
+        """Read exactly len(buffer) bytes from the robot into a preallocated buffer.
+        
+            Arguments:
+                buffer: A writable memoryview of the size we expect to read. Reusing the same
+                    view for every read means no new objects get made for the data.
+        """
+        self.writer.flush()
+        num_bytes = len(buffer)
+        received = self.ser.readinto(buffer)
+        # Only a short read (serial timeout) needs to slice the view
+        while received and received < num_bytes:
+            count = self.ser.readinto(buffer[received:])
+            if not count:
+                break
+            received += count
+        if not received:
+            raise _ROIFailedToReceiveError('Error reading from SCI port. No data.')
+        if received != num_bytes:
+            raise _ROIFailedToReceiveError('Error reading from SCI port. Wrong data length.')
+        return buffer
+    
     def Close(self):
         """Closes the serial connection.
         """
@@ -220,34 +457,87 @@ class _Create2(object):
     
     """
     
-    def __init__(self, port, baud):
+    def __init__(self, port, baud, sci=None, transport=None):
         
-        self.SCI = _SerialCommandInterface(port, baud)
+        # sci lets another command interface stand in for the serial one, and transport
+        # another serial-port-like object stand in for a serial.Serial
+        self.SCI = sci if sci is not None else _SerialCommandInterface(port, baud, transport)
+        # Nothing on the command or sensor paths reads it, so it is only loaded if asked for
         self.config = _Config()
-        self.config.load()
-        self.decoder = _sensorPacketDecoder(dict(self.config.data['sensor group packet lengths']))
-        # Load a raw sensor dict. None of these values are correct.
-        self.sensor_state = dict(self.config.data['sensor data']) 
+        self.SCI.writer.configure(_COALESCED_COMMANDS, _RESET_COMMANDS)
+        self.decoder = _sensorPacketDecoder(PACKET_LENGTHS)
+        # One preallocated read buffer per packet id (None for ids that aren't packets),
+        # and one per packet list used with query_list()
+        self.packet_buffers = tuple(memoryview(bytearray(length)) if length else None
+                                    for length in PACKET_LENGTHS)
+        self.query_buffers = {}
+        # None of these values are correct until the first packet comes in.
+        self.sensor_state = SensorState()
+        # Guards sensor_state against the stream reader thread
+        self.sensor_lock = threading.Lock()
+        self.stream_reader = None
+        # Called with the sensor state after every decode; see add_sensor_listener()
+        self.sensor_listeners = []
         self.sleep_timer = .5
         
     
     def destroy(self):
         """Closes up serial ports and terminates connection to the Create2
         """
+        self.stop_stream()
+        self.SCI.writer.flush()
         self.SCI.Close()
         print('disconnected')
     
     
+    def add_sensor_listener(self, listener):
+        """Has listener(sensor_state, timestamp, packet_ids) called every time new sensor
+            packets are decoded, whether polled or streamed, with timestamp from
+            time.monotonic() and a tuple of the ids of the packets (or groups) decoded;
+            the other values in sensor_state are left from earlier reads, or zero.
+            It runs holding sensor_lock, on the stream reader thread when streaming, so
+            it should be quick and must not call back into the robot.
+        
+            Arguments:
+                listener: The function to call.
+        """
+        self.sensor_listeners.append(listener)
+    
+    def remove_sensor_listener(self, listener):
+        """Stops calling a listener added with add_sensor_listener().
+        """
+        self.sensor_listeners.remove(listener)
+    
+    def _notify_sensor_listeners(self, packet_ids):
+        # Call with sensor_lock held
+        if self.sensor_listeners:
+            timestamp = time.monotonic()
+            for listener in self.sensor_listeners:
+                listener(self.sensor_state, timestamp, packet_ids)
+    
+    def batch(self):
+        """Returns a context manager; commands sent inside its 'with' block are written
+            together at the end of it, with drive and LED commands coalesced.
+        """
+        return self.SCI.batch()
+    
+    def forget_sent(self):
+        """Makes the next drive, LED, etc. command go to the robot even if it repeats the last
+            one.  Call this when the robot may have changed its state on its own, e.g. dropping
+            from safe to passive mode on a cliff or wheel drop.
+        """
+        self.SCI.writer.forget()
+    
     """ START OF OPEN INTERFACE COMMANDS
     """
     def start(self):
-        self.SCI.send(self.config.data['opcodes']['start'], None)
+        self.SCI.send(Opcode.START, None)
         
     def reset(self):
-        self.SCI.send(self.config.data['opcodes']['reset'], None)
+        self.SCI.send(Opcode.RESET, None)
         
     def stop(self):
-        self.SCI.send(self.config.data['opcodes']['stop'], None)
+        self.SCI.send(Opcode.STOP, None)
         
     def baud(self, baudRate):
         baud_dict = {
@@ -265,7 +555,7 @@ class _Create2(object):
             115200:11
             }
         if baudRate in baud_dict:
-            self.SCI.send(self.config.data['opcodes']['baud'], tuple(baud_dict[baudRate]))
+            self.SCI.send(Opcode.BAUD, tuple(baud_dict[baudRate]))
         else:
             raise _ROIDataByteError("Invalid buad rate")
     
@@ -274,30 +564,30 @@ class _Create2(object):
         """Puts the Create 2 into safe mode. Blocks for a short (<.5 sec) amount of time so the
             bot has time to change modes.
         """
-        self.SCI.send(self.config.data['opcodes']['safe'], None)
+        self.SCI.send(Opcode.SAFE, None)
         time.sleep(self.sleep_timer)
     
     def full(self):
         """Puts the Create 2 into full mode. Blocks for a short (<.5 sec) amount of time so the
             bot has time to change modes.
         """
-        self.SCI.send(self.config.data['opcodes']['full'], None)
+        self.SCI.send(Opcode.FULL, None)
         time.sleep(self.sleep_timer)
     
     def clean(self):
-        self.SCI.send(self.config.data['opcodes']['clean'], None)
+        self.SCI.send(Opcode.CLEAN, None)
     
     def max(self):
-        self.SCI.send(self.config.data['opcodes']['max'], None)
+        self.SCI.send(Opcode.MAX, None)
     
     def spot(self):
-        self.SCI.send(self.config.data['opcodes']['spot'], None)
+        self.SCI.send(Opcode.SPOT, None)
     
     def seek_dock(self):
-        self.SCI.send(self.config.data['opcodes']['seek_dock'], None)
+        self.SCI.send(Opcode.SEEK_DOCK, None)
     
     def power(self):
-        self.SCI.send(self.config.data['opcodes']['power'], None)
+        self.SCI.send(Opcode.POWER, None)
     
     def schedule(self):
         """Not implementing this for now.
@@ -345,7 +635,7 @@ class _Create2(object):
             raise _ROIDataByteError("Invalid minute input")
             
         if noError:
-            self.SCI.send(self.config.data['opcodes']['set_day_time'], tuple(data))
+            self.SCI.send(Opcode.SET_DAY_TIME, tuple(data))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
     
@@ -399,7 +689,7 @@ class _Create2(object):
             #Normally we would convert data to a tuple before sending it to SCI
             #   But struct.unpack already returns a tuple.
             
-            self.SCI.send(self.config.data['opcodes']['drive'], data)
+            self.SCI.send(Opcode.DRIVE, data)
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
         
@@ -449,7 +739,7 @@ class _Create2(object):
         
         #Send it off if there were no errors.
         if noError:
-            self.SCI.send(self.config.data['opcodes']['motors_pwm'], tuple(data))
+            self.SCI.send(Opcode.MOTORS_PWM, tuple(data))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
         
@@ -497,16 +787,17 @@ class _Create2(object):
             #Need to map ascii to numbers from the dict.
             for i in range (0,4):
                 #Check that the character is in the list, if it is, add it.
-                if display_string[i] in self.config.data['ascii table']:
-                    display_list.append(self.config.data['ascii table'][display_string[i]])
+                code = ord(display_string[i])
+                if code < len(ASCII_TABLE) and ASCII_TABLE[code]:
+                    display_list.append(ASCII_TABLE[code])
                 else:
                     # Char was not available. Just print a blank space
                     # Raise an error so the software knows that the input was bad
-                    display_list.append(self.config.data['ascii table'][' '])
+                    display_list.append(ASCII_TABLE[ord(' ')])
                     warnings.formatwarning = custom_format_warning
                     warnings.warn("Warning: Char '" + display_string[i] + "' was not found in ascii table")
                 
-            self.SCI.send(self.config.data['opcodes']['digit_led_ascii'], tuple(display_list))
+            self.SCI.send(Opcode.DIGIT_LED_ASCII, tuple(display_list))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
         
@@ -539,20 +830,20 @@ class _Create2(object):
         
         #writes the song note commands to play_list
         #change these to change notes
-        play_list.extend([self.config.data['midi table']['C#4'],medium_note])
-        play_list.extend([self.config.data['midi table']['G4'],long_note])
-        play_list.extend([self.config.data['midi table']['A#3'],short_note])
-        play_list.extend([self.config.data['midi table']['A3'],short_note])
+        play_list.extend([MIDI_TABLE['C#4'],medium_note])
+        play_list.extend([MIDI_TABLE['G4'],long_note])
+        play_list.extend([MIDI_TABLE['A#3'],short_note])
+        play_list.extend([MIDI_TABLE['A3'],short_note])
         
         #adds up the various commands and arrays
-        song_play = [self.config.data['opcodes']['play'], current_song]
+        song_play = [Opcode.PLAY, current_song]
         play_sequence = [song_setup + play_list + song_play]
         
         #flattens array
         play_sequence = [val for sublist in play_sequence for val in sublist]
         
         if noError:
-            self.SCI.send(self.config.data['opcodes']['song'], tuple(play_sequence))
+            self.SCI.send(Opcode.SONG, tuple(play_sequence))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
             
@@ -565,12 +856,12 @@ class _Create2(object):
         noError = True
         
         #the length of the song is the length of the array divided by 2
-        song_setup = [song_number,len(play_list)/2]
+        song_setup = [song_number,len(play_list)//2]
         play_list = [song_setup + play_list]
         play_list = [val for sublist in play_list for val in sublist]
 
         if noError:   
-            self.SCI.send(self.config.data['opcodes']['song'],tuple(play_list))
+            self.SCI.send(Opcode.SONG,tuple(play_list))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
 
@@ -580,7 +871,7 @@ class _Create2(object):
         noError = True
 
         if noError:
-            self.SCI.send(self.config.data['opcodes']['play'], tuple([song_number]))
+            self.SCI.send(Opcode.PLAY, tuple([song_number]))
         else:
             raise _ROIFailedToSendError("Invalid data, failed to send")
             
@@ -593,13 +884,13 @@ class _Create2(object):
         if noError:
             #Need to map ascii to numbers from the dict.
 
-            if note_name in self.config.data['midi table']:
-                play_list.append(self.config.data['midi table'][note_name])
+            if note_name in MIDI_TABLE:
+                play_list.append(MIDI_TABLE[note_name])
                 play_list.append(note_duration)
             else:
                 # That note doesn't exist. Plays nothing
                 # Raise an error so the software knows that the input was bad
-                play_list.append(self.config.data['midi table'][0])
+                play_list.append(MIDI_TABLE[0])
                 warnings.formatwarning = custom_format_warning
                 warnings.warn("Warning: Note '" + note_name + "' was not found in midi table")
             #create a song from play_list and play it
@@ -626,13 +917,13 @@ class _Create2(object):
             #Need to map midi to numbers from the dict.
             for i in range (0,len(note_list)):
                 #Check that the note is in the list, if it is, add it.
-                if note_list[i] in self.config.data['midi table']:
-                    play_list.append(self.config.data['midi table'][note_list[i]])
+                if note_list[i] in MIDI_TABLE:
+                    play_list.append(MIDI_TABLE[note_list[i]])
                     play_list.append(duration_list[i])
                 else:
                     # Note was not available. Play a rest
                     # Raise an error so the software knows that the input was bad
-                    play_list.append(self.config.data['midi table']['rest'])
+                    play_list.append(MIDI_TABLE['rest'])
                     play_list.append(duration_list[i])
                     warnings.formatwarning = custom_format_warning
                     warnings.warn("Warning: Note '" + note_string + "' was not found in midi table")
@@ -649,31 +940,75 @@ class _Create2(object):
             Arguments:
                 packet_id: Identifies which of the 58 sensor data packets should be sent back by the OI. 
         """
-        # Need to make sure the packet_id is a string
-        packet_id = str(packet_id)
+        packet_id = int(packet_id)
         # Check to make sure that the packet ID is valid.
-        if packet_id in self.config.data['sensor group packet lengths']:
-            # Valid packet, send request (But convert it back to an int in a list first)
-            packet_id = [int(packet_id)]
-            self.SCI.send(self.config.data['opcodes']['sensors'], tuple(packet_id))
+        if _packet_length(packet_id):
+            self.SCI.send(Opcode.SENSORS, (packet_id,))
         else:
             raise _ROIFailedToSendError("Invalid packet id, failed to send")
         
     
-    def query_list(self):
-        """Not implementing this for now.
-        """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+    def query_list(self, packet_ids):
+        """Requests a list of sensor packets with a single command, then reads and decodes
+            all of them in one pass.
+        
+            Arguments:
+                packet_ids: A list of the packet ids to collect, in the order the OI should send them.
+            
+            Returns: True if the packets successfully came through.
+        """
+        packet_ids = tuple(packet_ids)
+        if packet_ids not in self.query_buffers:
+            self.query_buffers[packet_ids] = self._make_query(packet_ids)
+        data, buffer, offsets = self.query_buffers[packet_ids]
+        self.SCI.send(Opcode.QUERY_LIST, data)
+        # The OI sends the packets back to back, with no ids or checksum
+        self.SCI.ReadInto(buffer)
+        with self.sensor_lock:
+            for packet_id, offset in offsets:
+                self.decoder.decode_packet(packet_id, buffer, self.sensor_state, offset)
+            self._notify_sensor_listeners(packet_ids)
+        return True
+
+    def _make_query(self, packet_ids):
+        """Validates a query_list() packet list once, and returns the command data, a read buffer,
+            and the offset of each packet in the buffer.
+        """
+        offsets = []
+        packet_size = 0
+        for packet_id in packet_ids:
+            length = _packet_length(int(packet_id))
+            if length:
+                offsets.append((int(packet_id), packet_size))
+                packet_size += length
+            else:
+                raise _ROIDataByteError("Invalid packet ID")
+        data = (len(packet_ids),) + tuple(packet_id for packet_id, _ in offsets)
+        return data, memoryview(bytearray(packet_size)), tuple(offsets)
     
-    def stream(self):
-        """Not implementing this for now.
+    def stream(self, packet_ids):
+        """Starts a continuous stream of sensor data packets. The OI sends a new frame
+            every 15 ms until the stream is paused or the robot changes OI mode.
+        
+            Arguments:
+                packet_ids: A list of the packet ids to stream. Don't ask for more data than
+                    fits in 15 ms at the current baud rate.
         """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+        data = [len(packet_ids)]
+        for packet_id in packet_ids:
+            if _packet_length(int(packet_id)):
+                data.append(int(packet_id))
+            else:
+                raise _ROIFailedToSendError("Invalid packet id, failed to send")
+        self.SCI.send(Opcode.STREAM, tuple(data))
     
-    def pause_resume_stream(self):
-        """Not implementing this for now.
+    def pause_resume_stream(self, resume):
+        """Pauses or resumes a stream started by stream(), without clearing its packet list.
+        
+            Arguments:
+                resume: True to resume the stream, False to pause it.
         """
-        #self.SCI.send(self.config.data['opcodes']['start'],0)
+        self.SCI.send(Opcode.PAUSE_RESUME_STREAM, (1 if resume else 0,))
 
     """ END OF OPEN INTERFACE COMMANDS
     """
@@ -705,6 +1040,30 @@ class _Create2(object):
                     negative velocities are reverse. Max speeds are still enforced by drive()
         """
         self.drive(velocity, 1)
+
+    def start_stream(self, packet_ids):
+        """ Starts a sensor stream and a background thread that decodes it into sensor_state.
+            Hold sensor_lock while reading sensor_state to get values from a single frame.
+        
+            Arguments:
+                packet_ids: A list of the packet ids to stream.
+        """
+        self.stop_stream()
+        self.stream_reader = _SensorStreamReader(self)
+        self.stream_reader.start()
+        self.stream(packet_ids)
+
+    def stop_stream(self):
+        """ Pauses the sensor stream and stops its reader thread, if there is one.
+        """
+        if self.stream_reader is not None:
+            self.pause_resume_stream(False)
+            self.stream_reader.stop()
+            self.stream_reader = None
+            # Drop frames that were on the way when the robot paused, and any partial frame
+            # the reader gave up on, so the next query doesn't read them as its answer
+            time.sleep(_STREAM_PERIOD)
+            self.SCI.ser.reset_input_buffer()
     
     def get_packet(self, packet_id):
         """ Requests and reads a packet from the Create 2
@@ -714,20 +1073,18 @@ class _Create2(object):
             
             Returns: False if there was an error, True if the packet successfully came through.
         """
-        packet_id = str(packet_id)
-        packet_size = None
-        packet_byte_data = None
-        if packet_id in self.config.data['sensor group packet lengths']:
-            # If a packet is in this dict, that means it is valid
-            packet_size = self.config.data['sensor group packet lengths'][packet_id]
+        packet_id = int(packet_id)
+        if _packet_length(packet_id):
+            # If a packet has a length, that means it is valid
+            buffer = self.packet_buffers[packet_id]
             #Let the robot know that we want some sensor data!
             self.sensors(packet_id)
-            #Read the data
-            packet_byte_data = list(self.SCI.Read(packet_size))
-            if type(packet_byte_data[0]) is int: # support Python3
-                packet_byte_data = [chr(x) for x in packet_byte_data]
+            #Read the data straight into the packet's buffer
+            self.SCI.ReadInto(buffer)
             # Once we have the byte data, we need to decode the packet and save the new sensor state
-            self.sensor_state = self.decoder.decode_packet(packet_id, packet_byte_data, self.sensor_state)
+            with self.sensor_lock:
+                self.decoder.decode_packet(packet_id, buffer, self.sensor_state)
+                self._notify_sensor_listeners((packet_id,))
             return True
         else:
             #The packet was invalid, raise an error
@@ -736,6 +1093,288 @@ class _Create2(object):
 
 
 
+class _SensorStreamReader(threading.Thread):
+    """ A thread that reads the sensor stream started by _Create2.stream() and decodes
+        each frame into the sensor_state of its _Create2.
+        
+        A stream frame is [19] [N-bytes] [Packet ID 1] [Packet 1 data] ... [Checksum], where
+        N-bytes counts the ids and data, and the low byte of the sum of every byte in the
+        frame (checksum included) is zero.
+    """
+    
+    HEADER = 19
+    
+    def __init__(self, create2, timeout=.1):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.create2 = create2
+        # Packet lengths indexed by id, zero for ids that aren't packets
+        self.lengths = PACKET_LENGTHS + (0,) * (256 - len(PACKET_LENGTHS))
+        self.ser = create2.SCI.ser
+        # Room for the largest frame, with a view of the frame body for every possible N-bytes
+        self.frame = bytearray(2 + 256)
+        view = memoryview(self.frame)
+        self.header = view[0:1]
+        self.count = view[1:2]
+        self.bodies = [view[2:3+count] for count in range(256)]
+        self.timeout = timeout
+        self.stopped = threading.Event()
+        self.frames = 0
+        self.errors = 0
+        self.timestamp = None
+    
+    def run(self):
+        # Reads must time out so that stop() can end the thread
+        old_timeout = self.ser.timeout
+        self.ser.timeout = self.timeout
+        try:
+            while not self.stopped.is_set():
+                count = self.read_frame()
+                if count is not None:
+                    self.decode_frame(count)
+        finally:
+            self.ser.timeout = old_timeout
+    
+    def stop(self):
+        """ Stops the thread and waits for it to finish.
+        """
+        self.stopped.set()
+        self.join(2 * self.timeout)
+    
+    def read_into(self, buffer):
+        """ Fills buffer from the serial port. Returns False if the thread was stopped first.
+        """
+        received = self.ser.readinto(buffer)
+        while received < len(buffer):
+            if self.stopped.is_set():
+                return False
+            received += self.ser.readinto(buffer[received:])
+        return True
+    
+    def read_frame(self):
+        """ Syncs to the next frame header and reads one frame into self.frame.
+            
+            Returns: The N-bytes of the frame, or None if there was no valid frame.
+        """
+        if not self.read_into(self.header) or self.frame[0] != self.HEADER:
+            return None
+        if not self.read_into(self.count):
+            return None
+        count = self.frame[1]
+        body = self.bodies[count]
+        if not self.read_into(body):
+            return None
+        if (self.HEADER + count + sum(body)) & 0xFF:
+            self.errors += 1
+            return None
+        return count
+    
+    def packet_ids(self, end):
+        """ Returns the ids of the packets in the frame in self.frame, which has been checked.
+        """
+        frame = self.frame
+        packet_ids = []
+        index = 2
+        while index < end:
+            packet_ids.append(frame[index])
+            index += 1 + self.lengths[frame[index]]
+        return tuple(packet_ids)
+    
+    def decode_frame(self, count):
+        """ Decodes every packet in the frame in self.frame into the sensor state.
+        """
+        frame = self.frame
+        end = 2 + count
+        # Check the packets before taking the lock, so that a bad frame changes nothing
+        index = 2
+        while index < end:
+            length = self.lengths[frame[index]]
+            if not length or index + 1 + length > end:
+                self.errors += 1
+                return
+            index += 1 + length
+        with self.create2.sensor_lock:
+            index = 2
+            while index < end:
+                packet_id = frame[index]
+                self.create2.decoder.decode_packet(packet_id, frame, self.create2.sensor_state, index + 1)
+                index += 1 + self.lengths[packet_id]
+            if self.create2.sensor_listeners:
+                self.create2._notify_sensor_listeners(self.packet_ids(end))
+        self.frames += 1
+        self.timestamp = time.time()
+
+
+
+# Single sensor packets: packet id -> (struct format, sensor_state key).  All data is
+# big-endian.  The unused packets have no key and are skipped as pad bytes.
+_SENSOR_PACKETS = {
+    7:  ('B',  'wheel drop and bumps'),
+    8:  ('?',  'wall seen'),
+    9:  ('?',  'cliff left'),
+    10: ('?',  'cliff front left'),
+    11: ('?',  'cliff front right'),
+    12: ('?',  'cliff right'),
+    13: ('?',  'virtual wall'),
+    14: ('B',  'wheel overcurrents'),
+    15: ('B',  'dirt detect'),
+    16: ('x',  None),
+    17: ('B',  'infared char omni'),
+    18: ('B',  'buttons'),
+    19: ('h',  'distance'),
+    20: ('h',  'angle'),
+    21: ('B',  'charging state'),
+    22: ('H',  'voltage'),
+    23: ('h',  'current'),
+    24: ('b',  'temperature'),
+    25: ('H',  'battery charge'),
+    26: ('H',  'battery capacity'),
+    27: ('H',  'wall signal'),
+    28: ('H',  'cliff left signal'),
+    29: ('H',  'cliff front left signal'),
+    30: ('H',  'cliff front right signal'),
+    31: ('H',  'cliff right signal'),
+    32: ('x',  None),
+    33: ('2x', None),
+    34: ('B',  'charging sources available'),
+    35: ('B',  'oi mode'),
+    36: ('B',  'song number'),
+    37: ('?',  'song playing'),
+    38: ('B',  'number of stream packets'),
+    39: ('h',  'requested velocity'),
+    40: ('h',  'requested radius'),
+    41: ('h',  'requested right velocity'),
+    42: ('h',  'requested left velocity'),
+    43: ('H',  'left encoder counts'),
+    44: ('H',  'right encoder counts'),
+    45: ('B',  'light bumper'),
+    46: ('H',  'light bump left signal'),
+    47: ('H',  'light bump front left signal'),
+    48: ('H',  'light bump center left signal'),
+    49: ('H',  'light bump center right signal'),
+    50: ('H',  'light bump front right signal'),
+    51: ('H',  'light bump right signal'),
+    52: ('B',  'infared char left'),
+    53: ('B',  'infared char right'),
+    54: ('h',  'left motor current'),
+    55: ('h',  'right motor current'),
+    56: ('h',  'main brush motor current'),
+    57: ('h',  'side brush motor current'),
+    58: ('?',  'stasis'),
+    }
+
+# Group packets: packet id -> (first, last) single packet they contain
+_SENSOR_GROUPS = {
+    0:   (7, 26),
+    1:   (7, 16),
+    2:   (17, 20),
+    3:   (21, 26),
+    4:   (27, 34),
+    5:   (35, 42),
+    6:   (7, 42),
+    100: (7, 58),
+    101: (43, 58),
+    106: (46, 51),
+    107: (54, 58),
+    }
+
+# Packets whose byte is a bitfield, decoded into a dict of booleans
+_SENSOR_BITS = {
+    'wheel drop and bumps': (
+        ('drop left', 0x08),
+        ('drop right', 0x04),
+        ('bump left', 0x02),
+        ('bump right', 0x01)),
+    'wheel overcurrents': (
+        ('left wheel', 0x10),
+        ('right wheel', 0x08),
+        ('main brush', 0x04),
+        ('side brush', 0x01)),
+    'buttons': (
+        ('clock', 0x80),
+        ('schedule', 0x40),
+        ('day', 0x20),
+        ('hour', 0x10),
+        ('minute', 0x08),
+        ('dock', 0x04),
+        ('spot', 0x02),
+        ('clean', 0x01)),
+    'charging sources available': (
+        ('home base', 0x02),
+        ('internal charger', 0x01)),
+    'light bumper': (
+        ('right', 0x20),
+        ('front right', 0x10),
+        ('center right', 0x08),
+        ('center left', 0x04),
+        ('front left', 0x02),
+        ('left', 0x01)),
+    }
+
+# Name of the properties for each bit of a bitfield: prefix + bit name, with underscores
+_SENSOR_BIT_PREFIXES = {
+    'wheel drop and bumps': '',
+    'wheel overcurrents': 'overcurrent ',
+    'buttons': 'button ',
+    'charging sources available': '',
+    'light bumper': 'light bumper ',
+    }
+
+# sensor_state key -> SensorState attribute, in packet order
+_SENSOR_SLOTS = dict((key, key.replace(' ', '_')) for _, key in _SENSOR_PACKETS.values() if key is not None)
+
+def _compile_sensor_packets():
+    """ Builds packet id -> (struct.Struct, SensorState attributes) for every single and group packet.
+    """
+    members = dict((packet_id, (packet_id,)) for packet_id in _SENSOR_PACKETS)
+    for packet_id, (first, last) in _SENSOR_GROUPS.items():
+        members[packet_id] = tuple(range(first, last+1))
+    packets = {}
+    for packet_id, ids in members.items():
+        fmt = '>' + ''.join(_SENSOR_PACKETS[i][0] for i in ids)
+        slots = tuple(_SENSOR_SLOTS[_SENSOR_PACKETS[i][1]] for i in ids if _SENSOR_PACKETS[i][1] is not None)
+        packets[packet_id] = (struct.Struct(fmt), slots)
+    return packets
+
+_SENSOR_DECODERS = _compile_sensor_packets()
+
+
+class SensorState(object):
+    """ The latest value of every sensor, updated in place as packets are decoded.
+        
+        Each sensor is an attribute named after its sensor key with underscores for spaces
+        (e.g. 'wall signal' -> wall_signal).  Bitfield packets hold their raw byte; their bits
+        are read through properties such as bump_left or button_clean.  Indexing by sensor
+        key, or as_dict(), gives the values in the old sensor_state dict form.
+    """
+    
+    __slots__ = tuple(_SENSOR_SLOTS.values())
+    
+    def __init__(self):
+        for packet_format, key in _SENSOR_PACKETS.values():
+            if key is not None:
+                setattr(self, _SENSOR_SLOTS[key], False if packet_format == '?' else 0)
+    
+    def __getitem__(self, key):
+        value = getattr(self, _SENSOR_SLOTS[key])
+        if key in _SENSOR_BITS:
+            value = dict((name, bool(value & mask)) for name, mask in _SENSOR_BITS[key])
+        return value
+    
+    def as_dict(self):
+        """ Returns a dict of every sensor value, keyed like config.json's 'sensor data'.
+        """
+        return dict((key, self[key]) for key in _SENSOR_SLOTS)
+
+def _bit_property(slot, mask):
+    return property(lambda self: bool(getattr(self, slot) & mask))
+
+for _key, _bits in _SENSOR_BITS.items():
+    for _name, _mask in _bits:
+        setattr(SensorState, (_SENSOR_BIT_PREFIXES[_key] + _name).replace(' ', '_'), _bit_property(_SENSOR_SLOTS[_key], _mask))
+del _key, _bits, _name, _mask
+
+
 class _sensorPacketDecoder(object):
     """ A class that handles sensor packet decoding. 
         
@@ -745,1018 +1384,47 @@ class _sensorPacketDecoder(object):
     """
     
     def __init__(self, sensor_packet_lengths):
+        # Packet lengths indexed by id, like constants.PACKET_LENGTHS
         self.lengths = sensor_packet_lengths
+        for packet_id, length in enumerate(self.lengths):
+            if length and _SENSOR_DECODERS[packet_id][0].size != length:
+                raise _Error("Packet %s should be %d bytes long" % (packet_id, _SENSOR_DECODERS[packet_id][0].size))
+        # (struct, slots) indexed by packet id, None for ids that aren't packets
+        self.decoders = tuple(_SENSOR_DECODERS.get(packet_id) for packet_id in range(256))
     
-    def decode_packet(self, packet_id, byte_data, sensor_data):
+    def decode_packet(self, packet_id, byte_data, sensor_data, offset=0):
         """ Decodes an OI packet
             
             Arguments:
                 packet_id: The id of the packet. Duh.
                 byte_data: The bytes that the Create 2 sent over serial
-                sensor_data: A dict containing the sensor states of the Create 2
+                sensor_data: The SensorState of the Create 2, updated in place
+                offset: Where the packet starts in byte_data
             Returns:
-                A dict containing the updated sensor states of the Create 2
+                The updated SensorState
         """
-        id = int(packet_id)  # Convert the packet id from a string to an int
-        
-        # Depending on the packet id, we will need to do different decoding.
-        # Packets 1-6 and 100, 101, 106, and 107 are special cases where they
-        #   contain groups of packets.
-        #
-        # Other packets (7-58) are single packets, but some of them have two byte
-        #   data, and also need special treatment.
+        id = int(packet_id)
+        decoder = self.decoders[id] if 0 <= id < 256 else None
         
-        # Hold onto your hats. This is gonna get long fast.
-        if id == 0:
-            # Size 26, contains packet 7-26
-            # We decode the data in reverse order to make pop() simpler
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 1:
-            # Size 10, contains 7-16
-            self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 2:
-            # size 6, contains 17-20
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_17(byte_data.pop())
-            
-        elif id == 3:
-            # size 10, contains 21-26
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            
-        elif id == 4:
-            # size 14, contains 27-34
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            
-        elif id == 5:
-            # size 12, contains 35-42
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            
-        elif id == 6:
-            # size 52, contains 7-42
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 7:
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-        elif id == 8:
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-        elif id == 9:
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-        elif id == 10:
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-        elif id == 11:
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-        elif id == 12:
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-        elif id == 13:
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-        elif id == 14:
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-        elif id == 15:
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-        elif id == 16:
-            #unused
-            self.decode_packet_16(byte_data.pop())
-        elif id == 17:
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-        elif id == 18:
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-        elif id == 19:
-            #2
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-        elif id == 20:
-            #2
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-        elif id == 21:
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-        elif id == 22:
-            #2
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-        elif id == 23:
-            #2
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-        elif id == 24:
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-        elif id == 25:
-            #2
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-        elif id == 26:
-            #2
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-        elif id == 27:
-            #2
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-        elif id == 28:
-            #2
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-        elif id == 29:
-            #2
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-        elif id == 30:
-            #2
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-        elif id == 31:
-            #2
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-        elif id == 32:
-            self.decode_packet_32(byte_data.pop())
-        elif id == 33:
-            #2
-            self.decode_packet_33(byte_data.pop(), byte_data.pop())
-        elif id == 34:
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-        elif id == 35:
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-        elif id == 36:
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-        elif id == 37:
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-        elif id == 38:
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-        elif id == 39:
-            #2
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-        elif id == 40:
-            #2
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-        elif id == 41:
-            #2
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-        elif id == 42:
-            #2
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-        elif id == 43:
-            #2
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-        elif id == 44:
-            #2
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-        elif id == 45:
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-        elif id == 46:
-            #2
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-        elif id == 47:
-            #2
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-        elif id == 48:
-            #2
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-        elif id == 49:
-            #2
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-        elif id == 50:
-            #2
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-        elif id == 51:
-            #2
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-        elif id == 52:
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-        elif id == 53:
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-        elif id == 54:
-            #2
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-        elif id == 55:
-            #2
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-        elif id == 56:
-            #2
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-        elif id == 57:
-            #2
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-        elif id == 58:
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            ##### Single Packets END
-        elif id == 100:
-            # size 80, contains 7-58 (ALL)
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-            sensor_data['requested left velocity'] = self.decode_packet_42(byte_data.pop(), byte_data.pop())
-            sensor_data['requested right velocity'] = self.decode_packet_41(byte_data.pop(), byte_data.pop())
-            sensor_data['requested radius'] = self.decode_packet_40(byte_data.pop(), byte_data.pop())
-            sensor_data['requested velocity'] = self.decode_packet_39(byte_data.pop(), byte_data.pop())
-            sensor_data['number of stream packets'] = self.decode_packet_38(byte_data.pop())
-            sensor_data['song playing'] = self.decode_packet_37(byte_data.pop())
-            sensor_data['song number'] = self.decode_packet_36(byte_data.pop())
-            sensor_data['oi mode'] = self.decode_packet_35(byte_data.pop())
-            sensor_data['charging sources available'] = self.decode_packet_34(byte_data.pop())
-            self.decode_packet_33(byte_data.pop(), byte_data.pop())
-            self.decode_packet_32(byte_data.pop())
-            sensor_data['cliff right signal'] = self.decode_packet_31(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front right signal'] = self.decode_packet_30(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff front left signal'] = self.decode_packet_29(byte_data.pop(), byte_data.pop())
-            sensor_data['cliff left signal'] = self.decode_packet_28(byte_data.pop(), byte_data.pop())
-            sensor_data['wall signal'] = self.decode_packet_27(byte_data.pop(), byte_data.pop())
-            sensor_data['battery capacity'] = self.decode_packet_26(byte_data.pop(), byte_data.pop())
-            sensor_data['battery charge'] = self.decode_packet_25(byte_data.pop(), byte_data.pop())
-            sensor_data['temperature'] = self.decode_packet_24(byte_data.pop())
-            sensor_data['current'] = self.decode_packet_23(byte_data.pop(), byte_data.pop())
-            sensor_data['voltage'] = self.decode_packet_22(byte_data.pop(), byte_data.pop())
-            sensor_data['charging state'] = self.decode_packet_21(byte_data.pop())
-            sensor_data['angle'] = self.decode_packet_20(byte_data.pop(), byte_data.pop())
-            sensor_data['distance'] = self.decode_packet_19(byte_data.pop(), byte_data.pop())
-            sensor_data['buttons'] = self.decode_packet_18(byte_data.pop())
-            sensor_data['infared char omni'] = self.decode_packet_17(byte_data.pop())
-            self.decode_packet_16(byte_data.pop())
-            sensor_data['dirt detect'] = self.decode_packet_15(byte_data.pop())
-            sensor_data['wheel overcurrents'] = self.decode_packet_14(byte_data.pop())
-            sensor_data['virtual wall'] = self.decode_packet_13(byte_data.pop())
-            sensor_data['cliff right'] = self.decode_packet_12(byte_data.pop())
-            sensor_data['cliff front right'] = self.decode_packet_11(byte_data.pop())
-            sensor_data['cliff front left'] = self.decode_packet_10(byte_data.pop())
-            sensor_data['cliff left'] = self.decode_packet_9(byte_data.pop())
-            sensor_data['wall seen'] = self.decode_packet_8(byte_data.pop())
-            sensor_data['wheel drop and bumps'] = self.decode_packet_7(byte_data.pop())
-            
-        elif id == 101:
-            # size 28, contains 43-58
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            sensor_data['infared char right'] = self.decode_packet_53(byte_data.pop())
-            sensor_data['infared char left'] = self.decode_packet_52(byte_data.pop())
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            sensor_data['light bumper'] = self.decode_packet_45(byte_data.pop())
-            sensor_data['right encoder counts'] = self.decode_packet_44(byte_data.pop(), byte_data.pop())
-            sensor_data['left encoder counts'] = self.decode_packet_43(byte_data.pop(), byte_data.pop())
-            
-        elif id == 106:
-            # size 12, contains 46-51
-            sensor_data['light bump right signal'] = self.decode_packet_51(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front right signal'] = self.decode_packet_50(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center right signal'] = self.decode_packet_49(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump center left signal'] = self.decode_packet_48(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump front left signal'] = self.decode_packet_47(byte_data.pop(), byte_data.pop())
-            sensor_data['light bump left signal'] = self.decode_packet_46(byte_data.pop(), byte_data.pop())
-            
-        elif id == 107:
-            # size 9, contains 54-58
-            sensor_data['stasis'] = self.decode_packet_58(byte_data.pop())
-            sensor_data['side brush motor current'] = self.decode_packet_57(byte_data.pop(), byte_data.pop())
-            sensor_data['main brush motor current'] = self.decode_packet_56(byte_data.pop(), byte_data.pop())
-            sensor_data['right motor current'] = self.decode_packet_55(byte_data.pop(), byte_data.pop())
-            sensor_data['left motor current'] = self.decode_packet_54(byte_data.pop(), byte_data.pop())
-            
-        else:
+        if decoder is None:
             warnings.formatwarning = custom_format_warning
-            warnings.warn("Warning: Packet '" + id + "' is not a valid packet!")
-            
+            warnings.warn("Warning: Packet '" + str(id) + "' is not a valid packet!")
+            return sensor_data
         
-        # No, Python doesn't need a switch case at all.
+        # One unpack for the whole packet, group packets included
+        packer, slots = decoder
+        for slot, value in zip(slots, packer.unpack_from(byte_data, offset)):
+            setattr(sensor_data, slot, value)
         
         return sensor_data
-        
-    def decode_packet_7(self, data):
-        """ Decode Packet 7 (wheel drop and bumps) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'wheel drop and bumps'
-        """
-        byte = self.safe_unpack('B', data)[0]
-        return_dict = {
-            'drop left': bool(byte & 0x08),
-            'drop right': bool(byte & 0x04),
-            'bump left': bool(byte & 0x02),
-            'bump right': bool(byte & 0x01)}
-        return return_dict
-
-    def decode_packet_8(self, data):
-        """ Decode Packet 8 (wall seen) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-
-    def decode_packet_9(self, data):
-        """ Decode Packet 9 (cliff left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)   
-
-    def decode_packet_10(self, data):
-        """ Decode Packet 10 (cliff front left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-
-    def decode_packet_11(self, data):
-        """ Decode Packet 11 (cliff front right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-
-    def decode_packet_12(self, data):
-        """ Decode Packet 12 (cliff right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-
-    def decode_packet_13(self, data):
-        """ Decode Packet 13 (virtual wall) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False
-        """
-        return self.decode_bool(data)
-        
-    def decode_packet_14(self, data):
-        """ Decode Packet 14 (wheel overcurrents) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'wheel overcurrents'
-        """
-        byte = self.safe_unpack('B', data)[0]
-        return_dict = {
-            'left wheel': bool(byte & 0x10),
-            'right wheel': bool(byte & 0x08),
-            'main brush': bool(byte & 0x04),
-            'side brush': bool(byte & 0x01)}
-        return return_dict
-        
-    def decode_packet_15(self, data):
-        """ Decode Packet 15 (dirt detect) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)        
-
-    def decode_packet_16(self, data):
-        """ Decode Packet 16 (unused byte) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: None
-        """
-        return None  
-
-    def decode_packet_17(self, data):
-        """ Decode Packet 17 (infared char omni) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)
-
-    def decode_packet_18(self, data):
-        """ Decode Packet 18 (buttons) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: a dict of 'buttons'
-        """
-        byte = self.safe_unpack('B', data)[0]
-        return_dict = {
-            'clock': bool(byte & 0x80),
-            'schedule': bool(byte & 0x40),
-            'day': bool(byte & 0x20),
-            'hour': bool(byte & 0x10),
-            'minute': bool(byte & 0x08),
-            'dock': bool(byte & 0x04),
-            'spot': bool(byte & 0x02),
-            'clean': bool(byte & 0x01)}
-        
-        return return_dict
-
-    def decode_packet_19(self, low, high):
-        """ Decode Packet 19 (distance) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short
-        """
-        return self.decode_short(low, high)
-
-    def decode_packet_20(self, low, high):
-        """ Decode Packet 20 (angle) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16 bit short. Represents difference between distance two wheels travelled
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_21(self, data):
-        """ Decode Packet 21 (charging state) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A value from 0-5, that describes the charging state
-        """
-        return self.decode_unsigned_byte(data)
-
-    def decode_packet_22(self, low, high):
-        """ Decode Packet 22 (voltage) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short, battery voltage in mV
-        """
-        return self.decode_unsigned_short(low, high)
-
-    def decode_packet_23(self, low, high):
-        """ Decode Packet 23 (current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Positive currents is charging, negative is discharging
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_24(self, data):
-        """ Decode Packet 24 (temperature) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A signed byte, Create 2's battery temperature in Celsius
-        """
-        return self.decode_byte(data)
-        
-    def decode_packet_25(self, low, high):
-        """ Decode Packet 25 (battery charge) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Current charge of battery in milliAmp-hours
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_26(self, low, high):
-        """ Decode Packet 26 (battery capacity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Estimated charge capacity of battery in milliAmp-hours
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_27(self, low, high):
-        """ Decode Packet 27 (wall signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of wall signal from 0-1023
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_28(self, low, high):
-        """ Decode Packet 28 (cliff left signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_29(self, low, high):
-        """ Decode Packet 29 (cliff front left signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff front left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_30(self, low, high):
-        """ Decode Packet 30 (cliff front right signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff front right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_31(self, low, high):
-        """ Decode Packet 31 (cliff right signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of cliff right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_32(self, data):
-        """ Decode Packet 32 (Unused) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: None
-        """
-        return None
-        
-    def decode_packet_33(self, low, high):
-        """ Decode Packet 33 (Unused) and return its value
-        
-            Arguments:
-                low: The bytes to ignore
-                high: The bytes to ignore
-        
-            Returns: None
-        """
-        return None
-        
-    def decode_packet_34(self, data):
-        """ Decode Packet 34 (charging sources available) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'charging sources available'
-        """
-        byte = self.safe_unpack('B', data)[0]
-        return_dict = {
-            'home base': bool(byte & 0x02),
-            'internal charger': bool(byte & 0x01)}
-        
-        return return_dict
-
-    def decode_packet_35(self, data):
-        """ Decode Packet 35 (OI Mode) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A unsigned byte, the current OI mode id from 0-3
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_36(self, data):
-        """ Decode Packet 36 (Song number) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: An unsigned byte, the current song id playing (0-15)
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_37(self, data):
-        """ Decode Packet 35 (Song playing) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True or False, stating whether the song is playing
-        """
-        return self.decode_bool(data)
-        
-    def decode_packet_38(self, data):
-        """ Decode Packet 38 (Number of stream packets) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: An unsigned byte, the number of data stream packets
-        """
-        return self.decode_unsigned_byte(data)
-        
-    def decode_packet_39(self, low, high):
-        """ Decode Packet 39 (requested velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Velocity most recently requested by Drive()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_40(self, low, high):
-        """ Decode Packet 40 (requested radius) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Radius most recently requested by Drive()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_41(self, low, high):
-        """ Decode Packet 41 (Requested right velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Right wheel velocity recently requested by DriveDirect()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_42(self, low, high):
-        """ Decode Packet 42 (Requested left velocity) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Left wheel velocity recently requested by DriveDirect()
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_43(self, low, high):
-        """ Decode Packet 41 (Left Encoder Counts) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Cumulative number of raw left encoder counts. Rolls over
-                        to 0 after it passes 65535
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_44(self, low, high):
-        """ Decode Packet 44 (Right Encoder Counts) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Cumulative number of raw right encoder counts. Rolls over
-                        to 0 after it passes 65535
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_45(self, data):
-        """ Decode Packet 45 (infared char left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: A dict of 'light bumper'
-        """
-        byte = self.safe_unpack('B', data)[0]
-        return_dict = {
-            'right': bool(byte & 0x20),
-            'front right': bool(byte & 0x10),
-            'center right': bool(byte & 0x08),
-            'center left': bool(byte & 0x04),
-            'front left': bool(byte & 0x02),
-            'left': bool(byte & 0x01)}
-        return return_dict
-
-    def decode_packet_46(self, low, high):
-        """ Decode Packet 46 (Light Bump Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_47(self, low, high):
-        """ Decode Packet 47 (Light Bump Front Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump front left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_48(self, low, high):
-        """ Decode Packet 48 (Light Bump Center Left Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump center left signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_49(self, low, high):
-        """ Decode Packet 49 (Light Bump Center Right Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump center right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_50(self, low, high):
-        """ Decode Packet 50 (Light Bump Front Right Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump front right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_51(self, low, high):
-        """ Decode Packet 51 (Light Bump Right Signal) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: unsigned 16bit short. Strength of light bump right signal from 0-4095
-        """
-        return self.decode_unsigned_short(low, high)
-        
-    def decode_packet_52(self, data):
-        """ Decode Packet 52 (infared char left) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)          
-
-    def decode_packet_53(self, data):
-        """ Decode Packet 53 (infared char right) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: unsigned Byte (0-255)
-        """
-        return self.decode_unsigned_byte(data)  
-
-    def decode_packet_54(self, low, high):
-        """ Decode Packet 54 (Left Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of left motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
-
-    def decode_packet_55(self, low, high):
-        """ Decode Packet 55 (Right Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of right motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
-
-    def decode_packet_56(self, low, high):
-        """ Decode Packet 54 (Main Brush Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of main brush motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
-
-    def decode_packet_57(self, low, high):
-        """ Decode Packet 57 (Side Brush Motor Current) and return its value
-        
-            Arguments:
-                low: Low byte of the 2's complement. Low is specified first to make pop() easier
-                high: High byte of the 2's complement
-        
-            Returns: signed 16bit short. Strength of side brush motor current from -32768 - 32767 mA
-        """
-        return self.decode_short(low, high)
-        
-    def decode_packet_58(self, data):
-        """ Decode Packet 58 (Stasis) and return its value
-        
-            Arguments:
-                data: The bytes to decode
-        
-            Returns: True if robot is making forward progress, else False
-        """
-        return self.decode_bool(data)  
-
-    def safe_unpack(self, fmt, data):
-
-        return struct.unpack(fmt, data.encode('utf8'))
-
-    def decode_bool(self, byte):
-        """ Decode a byte and return the value
-        
-            Arguments:
-                byte: The byte to be decoded
-            Returns: True or False
-        """
-        return bool(self.safe_unpack('B', byte)[0])
-    
-
-    def decode_unsigned_short(self, low, high):
-        """ Decode an 16 bit unsigned short from two bytes. 
-        
-            Arguments:
-                low: The low byte of the 2's complement. This is specified first
-                    to make it easier when popping bytes off a list.
-                high: The high byte o the 2's complement.
-            Returns: 16bit unsigned short
-        """
-        return ord(high) << 8 | ord(low) # XXX does this discard sign?
-        
-    def decode_short(self, low, high):
-        """ Decode an 16 bit short from two bytes. 
-        
-            Arguments:
-                low: The low byte of the 2's complement. This is specified first
-                    to make it easier when popping bytes off a list.
-                high: The high byte of the 2's complement.
-            Returns: 16bit short
-        """
-        return ord(high) << 8 | ord(low) # XXX does this discard sign?
-        
-    def decode_byte(self, byte):
-        """ Decode a signed byte into a signed char 
-        
-            Arguments:
-                byte: The byte to be decoded
-            Returns: A signed int
-        """
-        return self.safe_unpack('b', byte)[0]
-    
-    def decode_unsigned_byte(self, byte):
-        """ Decode an unsigned byte into an unsigned char 
-        
-            Arguments:
-                byte: The byte to be decoded
-            Returns: An unsigned int
-        """
-        return self.safe_unpack('B', byte)[0]
-    
 
 
+def __getattr__(name):
+    # AsyncRobot and Fleet pull in asyncio and concurrent.futures, so only import them when asked for
+    if name == 'AsyncRobot':
+        from breezycreate2.asyncrobot import AsyncRobot
+        return AsyncRobot
+    if name == 'Fleet':
+        from breezycreate2.fleet import Fleet
+        return Fleet
+    raise AttributeError("module 'breezycreate2' has no attribute '%s'" % name)
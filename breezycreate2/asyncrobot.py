@@ -0,0 +1,285 @@
+'''
+asyncrobot.py - asyncio version of the Robot class
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import os
+import asyncio
+import serial
+
+from breezycreate2 import _Create2, _CommandWriter, _ROIFailedToReceiveError, _STREAM_PACKETS
+from breezycreate2.constants import Opcode
+
+class AsyncRobot(object):
+    '''
+    Like Robot, but for use from asyncio code: every method is a coroutine, and
+    nothing blocks the event loop while waiting on the robot.
+
+        bot = AsyncRobot()
+        await bot.connect()
+        await bot.setForwardSpeed(100)
+        print(await bot.getBumpers())
+        await bot.close()
+    '''
+
+    def __init__(self, port='/dev/ttyACM0', baud=115200):
+        '''
+        Sets up for the Create2 on the specified port at the specified baud rate.
+        Nothing talks to the robot until connect().
+        '''
+        self.port = port
+        self.baud = baud
+        self.robot = None
+        # One sensor request/response on the wire at a time
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def connect(self):
+        '''
+        Connects to the robot and puts it in full mode.
+        '''
+        sci = _AsyncSerialCommandInterface(self.port, self.baud)
+        await sci.open()
+        self.robot = _Create2(self.port, self.baud, sci)
+        self.robot.start()
+        await self.full()
+
+    async def close(self):
+        '''
+        Closes the connection to the robot, once every command sent has been written.
+        '''
+        self.robot.stop_stream()
+        await self.robot.SCI.close()
+        print('disconnected')
+
+    async def safe(self):
+        '''
+        Puts the robot in safe mode, giving it time to change modes.
+        '''
+        self.robot.SCI.send(Opcode.SAFE, None)
+        await asyncio.sleep(self.robot.sleep_timer)
+
+    async def full(self):
+        '''
+        Puts the robot in full mode, giving it time to change modes.
+        '''
+        self.robot.SCI.send(Opcode.FULL, None)
+        await asyncio.sleep(self.robot.sleep_timer)
+
+    async def playNote(self, note, duration):
+        '''
+        Plays a specified note for a specified duration.
+        Notes are specified in MIDI format; e.g., "A#8", "C9".
+        '''
+        self.robot.play_note(note, duration)
+
+    async def setForwardSpeed(self, speed):
+        '''
+        Sets the robot's forward speed (-500 to +500; negative for reverse).
+        '''
+        self.robot.drive_straight(speed)
+
+    async def setTurnSpeed(self, speed):
+        '''
+        Sets the robot's right turn speed (-500 to +500; negative for left turn).
+        '''
+        self.robot.turn_clockwise(speed)
+
+    async def getBumpers(self):
+        '''
+        Returns left,right bumper states as booleans.
+        '''
+        sensors = await self._get_sensors()
+        return sensors.bump_left, sensors.bump_right
+
+    async def getCliffSensors(self):
+        '''
+        Returns left, front-left, front-right, and right cliff states as booleans.
+        '''
+        sensors = await self._get_sensors()
+        return sensors.cliff_left, sensors.cliff_front_left, sensors.cliff_front_right, sensors.cliff_right
+
+    async def getWallSensor(self):
+        '''
+        Returns wall sensor value as a number.  Larger number means closer to wall.
+        '''
+        sensors = await self._get_sensors()
+        return sensors.wall_signal
+
+    async def _get_sensors(self):
+
+        await self.queryList(_STREAM_PACKETS)
+        return self.robot.sensor_state
+
+    async def queryList(self, packet_ids):
+        '''
+        Requests, reads and decodes a list of sensor packets into robot.sensor_state.
+        '''
+        robot = self.robot
+        packet_ids = tuple(packet_ids)
+        if packet_ids not in robot.query_buffers:
+            robot.query_buffers[packet_ids] = robot._make_query(packet_ids)
+        data, buffer, offsets = robot.query_buffers[packet_ids]
+        async with self.lock:
+            robot.SCI.send(Opcode.QUERY_LIST, data)
+            await robot.SCI.read_into(buffer)
+        with robot.sensor_lock:
+            for packet_id, offset in offsets:
+                robot.decoder.decode_packet(packet_id, buffer, robot.sensor_state, offset)
+            robot._notify_sensor_listeners(packet_ids)
+
+
+class _AsyncSerialProtocol(asyncio.Protocol):
+    """Collects the bytes coming from the robot and hands them to whoever is waiting for them.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.waiter = None
+        self.error = None
+        # Done once the transport has let go of the port
+        self.closed = None
+
+    def connection_made(self, transport):
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def data_received(self, data):
+        self.buffer += data
+        self.wake()
+
+    def connection_lost(self, exc):
+        self.error = exc or _ROIFailedToReceiveError('Serial port closed.')
+        self.wake()
+        if self.closed is not None and not self.closed.done():
+            self.closed.set_result(None)
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def read_into(self, buffer):
+        """Waits until len(buffer) bytes have come in, and copies them into buffer.
+        """
+        num_bytes = len(buffer)
+        while len(self.buffer) < num_bytes:
+            if self.error is not None:
+                raise self.error
+            self.waiter = asyncio.get_running_loop().create_future()
+            await self.waiter
+        buffer[:] = self.buffer[:num_bytes]
+        del self.buffer[:num_bytes]
+        return buffer
+
+
+class _AsyncWriteProtocol(asyncio.Protocol):
+    """Lets close() know when the write transport has written everything and let go of the port.
+    """
+
+    def __init__(self):
+        self.closed = None
+
+    def connection_made(self, transport):
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+class _AsyncSerialCommandInterface(object):
+    """Stands in for _SerialCommandInterface, with the tty driven by asyncio pipe transports.
+    
+        The port is opened and configured by pyserial, then its file descriptor is handed to
+        the event loop, so writes never block and reads are awaited with read_into().
+    """
+
+    def __init__(self, com, baud):
+
+        self.ser = serial.Serial()
+        self.ser.port = com
+        self.ser.baudrate = baud
+        self.protocol = _AsyncSerialProtocol()
+        self.read_transport = None
+        self.write_transport = None
+        self.write_protocol = None
+        self.writer = None
+
+    async def open(self):
+        """Opens the port and connects it to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.ser.isOpen():
+            self.ser.close()
+        self.ser.open()
+        fd = self.ser.fileno()
+        # Both transports share pyserial's descriptor; pyserial closes it
+        self.read_transport, _ = await loop.connect_read_pipe(lambda: self.protocol, os.fdopen(fd, 'rb', buffering=0, closefd=False))
+        self.write_transport, self.write_protocol = await loop.connect_write_pipe(_AsyncWriteProtocol, os.fdopen(fd, 'wb', buffering=0, closefd=False))
+        self.writer = _CommandWriter(self.write_transport.write)
+        print("connected")
+
+    def send(self, opcode, data, force=False):
+        self.writer.send(opcode, data, force)
+
+    def batch(self):
+        return self.writer
+
+    async def read_into(self, buffer):
+        """Read exactly len(buffer) bytes from the robot into buffer, without blocking the loop.
+        """
+        self.writer.flush()
+        return await self.protocol.read_into(buffer)
+
+    def Read(self, num_bytes):
+        raise _ROIFailedToReceiveError('Use AsyncRobot to read from an asyncio serial port.')
+
+    def ReadInto(self, buffer):
+        raise _ROIFailedToReceiveError('Use AsyncRobot to read from an asyncio serial port.')
+
+    async def close(self):
+        """Writes any queued commands, waits for the transports to finish with the port, and closes it.
+        """
+        self.writer.flush()
+        # A write transport only closes once its buffer is empty
+        self.write_transport.close()
+        await self.write_protocol.closed
+        self.read_transport.close()
+        await self.protocol.closed
+        self.ser.close()
+
+    def Close(self):
+        """Closes the transports and the serial connection at once, dropping anything not yet
+            written; from a coroutine, await close() instead.
+        """
+        self.read_transport.close()
+        self.write_transport.close()
+        self.ser.close()
@@ -0,0 +1,163 @@
+# Generated from config.json by genconstants.py -- do not edit.
+# Run "python -m breezycreate2.genconstants" after changing config.json.
+
+from enum import IntEnum
+from types import MappingProxyType
+
+class Opcode(IntEnum):
+    RESET = 7
+    START = 128
+    BAUD = 129
+    SAFE = 131
+    FULL = 132
+    POWER = 133
+    SPOT = 134
+    CLEAN = 135
+    MAX = 136
+    DRIVE = 137
+    MOTORS = 138
+    LED = 139
+    SONG = 140
+    PLAY = 141
+    SENSORS = 142
+    SEEK_DOCK = 143
+    MOTORS_PWM = 144
+    DRIVE_DIRECT = 145
+    DRIVE_PWM = 146
+    STREAM = 148
+    QUERY_LIST = 149
+    PAUSE_RESUME_STREAM = 150
+    SCHEDULING_LED = 162
+    DIGIT_LED_RAW = 163
+    DIGIT_LED_ASCII = 164
+    BUTTONS = 165
+    SCHEDULE = 167
+    SET_DAY_TIME = 168
+    STOP = 173
+
+# Sensor packet lengths in bytes, indexed by packet id; 0 for ids that are not packets
+PACKET_LENGTHS = (
+    26, 10, 6, 10, 14, 12, 52, 1, 1, 1, 1, 1, 1, 1, 1, 1,
+    1, 1, 1, 2, 2, 1, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2,
+    1, 2, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 1, 2, 2,
+    2, 2, 2, 2, 1, 1, 2, 2, 2, 2, 1, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 80, 28, 0, 0, 0, 0, 12, 9,
+    )
+
+# Note name -> MIDI note number
+MIDI_TABLE = MappingProxyType({
+    'R': 0,
+    'pause': 0,
+    'rest': 0,
+    'G1': 31,
+    'G#1': 32,
+    'A1': 33,
+    'A#1': 34,
+    'B1': 35,
+    'C2': 36,
+    'C#2': 37,
+    'D2': 38,
+    'D#2': 39,
+    'E2': 40,
+    'F2': 41,
+    'F#2': 42,
+    'G2': 43,
+    'G#2': 44,
+    'A2': 45,
+    'A#2': 46,
+    'B2': 47,
+    'C3': 48,
+    'C#3': 49,
+    'D3': 50,
+    'D#3': 51,
+    'E3': 52,
+    'F3': 53,
+    'F#3': 54,
+    'G3': 55,
+    'G#3': 56,
+    'A3': 57,
+    'A#3': 58,
+    'B3': 59,
+    'C4': 60,
+    'C#4': 61,
+    'D4': 62,
+    'D#4': 63,
+    'E4': 64,
+    'F4': 65,
+    'F#4': 66,
+    'G4': 67,
+    'G#4': 68,
+    'A4': 69,
+    'A#4': 70,
+    'B4': 71,
+    'C5': 72,
+    'C#5': 73,
+    'D5': 74,
+    'D#5': 75,
+    'E5': 76,
+    'F5': 77,
+    'F#5': 78,
+    'G5': 79,
+    'G#5': 80,
+    'A5': 81,
+    'A#5': 82,
+    'B5': 83,
+    'C6': 84,
+    'C#6': 85,
+    'D6': 86,
+    'D#6': 87,
+    'E6': 88,
+    'F6': 89,
+    'F#6': 90,
+    'G6': 91,
+    'G#6': 92,
+    'A6': 93,
+    'A#6': 94,
+    'B6': 95,
+    'C7': 96,
+    'C#7': 97,
+    'D7': 98,
+    'D#7': 99,
+    'E7': 100,
+    'F7': 101,
+    'F#7': 102,
+    'G7': 103,
+    'G#7': 104,
+    'A7': 105,
+    'A#7': 106,
+    'B7': 107,
+    'C8': 108,
+    'C#8': 109,
+    'D8': 110,
+    'D#8': 111,
+    'E8': 112,
+    'F8': 113,
+    'F#8': 114,
+    'G8': 115,
+    'G#8': 116,
+    'A8': 117,
+    'A#8': 118,
+    'B8': 119,
+    'C9': 120,
+    'C#9': 121,
+    'D9': 122,
+    'D#9': 123,
+    'E9': 124,
+    'F9': 125,
+    'F#9': 126,
+    'G9': 127,
+    })
+
+# Digit LED code, indexed by character code; 0 for characters the display can't show
+ASCII_TABLE = bytes((
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    32, 33, 34, 35, 0, 37, 38, 39, 0, 0, 0, 0, 44, 45, 46, 47,
+    48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63,
+    0, 65, 66, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79,
+    80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 40, 92, 41, 94, 95,
+    96, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 123, 124, 125, 126, 0,
+    ))
@@ -0,0 +1,266 @@
+'''
+fleet.py - Drive several Create2 robots from one program
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import collections
+import threading
+import time
+from concurrent.futures import Future, wait
+
+from breezycreate2 import _Create2, _STREAM_PACKETS
+
+# One robot's sensors from Fleet.getSensors(): its port, when they were read, and their values
+FleetReading = collections.namedtuple('FleetReading', 'port timestamp sensors')
+
+class Fleet(object):
+    '''
+    Connects to several Create2 robots at once, one serial port each, and gives
+    every robot its own I/O thread so that a slow port never holds up the others.
+
+        fleet = Fleet(['/dev/ttyACM0', '/dev/ttyACM1'])
+        fleet.drive(100, 32767)
+        for reading in fleet.getSensors():
+            print(reading.port, reading.sensors['wall signal'])
+        fleet.close()
+    '''
+
+    def __init__(self, ports, baud=115200):
+        '''
+        Connects to a Create2 on each of the specified ports, all at the same time.
+        '''
+        self.units = [_FleetUnit(port, baud) for port in ports]
+        for unit in self.units:
+            unit.start()
+        for unit in self.units:
+            unit.ready.wait()
+        errors = [unit.error for unit in self.units if unit.error is not None]
+        if errors:
+            self.close()
+            raise errors[0]
+
+    def close(self):
+        '''
+        Closes the connection to every robot.  Every robot is told to stop before
+        any is waited for, so one hung port can't keep the others driving.
+        '''
+        for unit in self.units:
+            unit.stop()
+        for unit in self.units:
+            unit.join()
+
+    def drive(self, velocity, radius):
+        '''
+        Sends the same drive command to every robot; returns a Future for each.  A
+        robot that hasn't sent the previous drive yet just sends this one instead,
+        cancelling the previous one's Future.  Velocity is -500..500 mm/s, and radius
+        -2000..2000 mm, or 32767 (straight), -1 or 1 (turn in place).
+        '''
+        if not -500 <= velocity <= 500:
+            raise ValueError('Drive velocity %s is outside -500..500' % velocity)
+        if radius not in (32767, -1, 1) and not -2000 <= radius <= 2000:
+            raise ValueError('Drive radius %s is outside -2000..2000' % radius)
+        return [unit.set_drive(velocity, radius) for unit in self.units]
+
+    def stop(self):
+        '''
+        Stops every robot's wheels.
+        '''
+        self.drive(0, 32767)
+
+    def broadcast(self, method, *args):
+        '''
+        Calls the named _Create2 method on every robot; returns a Future for each.
+        '''
+        return [unit.submit(getattr(_Create2, method), *args) for unit in self.units]
+
+    def getSensors(self, packet_ids=_STREAM_PACKETS, timeout=None):
+        '''
+        Reads the specified sensor packets from every robot at once.  Returns a
+        FleetReading per robot, in port order; a robot that takes longer than
+        timeout seconds gets None instead, and its read is skipped if it hasn't
+        started, so reads don't pile up on a slow port.
+        '''
+        futures = [unit.submit(_FleetUnit.read_sensors, tuple(packet_ids)) for unit in self.units]
+        wait(futures, timeout)
+        for future in futures:
+            future.cancel()
+        return [future.result() if future.done() and not future.cancelled() and future.exception() is None else None
+                for future in futures]
+
+    def getStats(self):
+        '''
+        Returns a dict of port -> latency stats for the commands run on that port.
+        '''
+        return dict((unit.port, unit.stats) for unit in self.units)
+
+
+class _LatencyStats(object):
+    """Running count, mean, and max of how long a port's commands took, in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.last = 0.
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def __repr__(self):
+        return 'count=%d mean=%.3fms max=%.3fms last=%.3fms' % (self.count, 1e3 * self.mean, 1e3 * self.max, 1e3 * self.last)
+
+
+class _FleetUnit(threading.Thread):
+    """The I/O thread for one robot of a Fleet.  It opens the robot's port, then runs
+        the jobs submitted to it in order, skipping any whose Future was cancelled.  The
+        latest drive command sits in its own slot, so drive commands never pile up behind
+        a slow port; it runs as soon as the jobs queued before it have, so it can't get
+        ahead of a mode change.  When stopped, it finishes the drive and jobs already
+        queued, stops the wheels, and closes the port.
+    """
+
+    def __init__(self, port, baud):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.port = port
+        self.baud = baud
+        self.create2 = None
+        self.error = None
+        self.ready = threading.Event()
+        self.stats = _LatencyStats()
+        self.condition = threading.Condition()
+        self.jobs = collections.deque()
+        # Jobs ever queued and ever taken from the queue
+        self.queued = 0
+        self.taken = 0
+        # (jobs queued before it, (future, function, args)) for the drive command not yet sent
+        self.drive_command = None
+        self.stopped = False
+
+    def run(self):
+        try:
+            self.create2 = _Create2(self.port, self.baud)
+            self.create2.start()
+            self.create2.full()
+        except Exception as error:
+            self.error = error
+            if self.create2 is not None:
+                self.create2.SCI.Close()
+        self.ready.set()
+        if self.error is not None:
+            self.fail_queued()
+            return
+        try:
+            while True:
+                with self.condition:
+                    while not self.stopped and self.drive_command is None and not self.jobs:
+                        self.condition.wait()
+                    if self.drive_command is not None and self.taken >= self.drive_command[0]:
+                        job = self.drive_command[1]
+                        self.drive_command = None
+                    elif self.jobs:
+                        job = self.jobs.popleft()
+                        self.taken += 1
+                    else:
+                        break
+                future, function, args = job
+                if future.set_running_or_notify_cancel():
+                    start = time.monotonic()
+                    try:
+                        future.set_result(function(self.create2, *args))
+                    except Exception as error:
+                        future.set_exception(error)
+                    self.stats.add(time.monotonic() - start)
+            # Leave the wheels stopped, whatever the last drive command was
+            self.create2.drive(0, 32767)
+        finally:
+            self.fail_queued()
+            self.create2.destroy()
+
+    def submit(self, function, *args):
+        """Queues function(create2, *args) to run on this thread; returns a Future for its result.
+        """
+        future = Future()
+        with self.condition:
+            if self.stopped or self.error is not None:
+                future.set_exception(RuntimeError('%s is closed' % self.port))
+                return future
+            self.jobs.append((future, function, args))
+            self.queued += 1
+            self.condition.notify()
+        return future
+
+    def set_drive(self, velocity, radius):
+        """Puts a drive command in the drive slot, replacing (and cancelling) any not yet sent,
+            to run after the jobs queued so far; returns a Future for it.
+        """
+        future = Future()
+        with self.condition:
+            if self.stopped or self.error is not None:
+                future.set_exception(RuntimeError('%s is closed' % self.port))
+                return future
+            if self.drive_command is not None:
+                self.drive_command[1][0].cancel()
+            self.drive_command = (self.queued, (future, _Create2.drive, (velocity, radius)))
+            self.condition.notify()
+        return future
+
+    def fail_queued(self):
+        """Fails the Futures of the drive and jobs that will never run, so nobody waits on them.
+        """
+        with self.condition:
+            self.stopped = True
+            queued = list(self.jobs)
+            if self.drive_command is not None:
+                queued.append(self.drive_command[1])
+            self.jobs.clear()
+            self.drive_command = None
+        for future, _, _ in queued:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError('%s is closed' % self.port))
+
+    def stop(self):
+        """Tells the thread to finish what is queued and close the port; join() to wait for it.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    @staticmethod
+    def read_sensors(create2, packet_ids):
+        create2.query_list(packet_ids)
+        with create2.sensor_lock:
+            return FleetReading(create2.SCI.ser.port, time.time(), create2.sensor_state.as_dict())
@@ -0,0 +1,115 @@
+'''
+genconstants.py - Generates constants.py from config.json
+
+constants.py holds the opcodes, sensor packet lengths, and MIDI and ASCII
+tables from config.json as plain Python constants, so the command and sensor
+paths don't have to look them up by name at run time.  Run this whenever
+config.json changes:
+
+    python -m breezycreate2.genconstants            # rewrite constants.py
+    python -m breezycreate2.genconstants --check    # exit 1 if it is stale
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import argparse
+import json
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEADER = '''# Generated from config.json by genconstants.py -- do not edit.
+# Run "python -m breezycreate2.genconstants" after changing config.json.
+
+from enum import IntEnum
+from types import MappingProxyType
+'''
+
+def generate(config):
+    '''
+    Returns the source of constants.py for the parsed config.json.
+    '''
+    lines = [HEADER]
+
+    lines.append('class Opcode(IntEnum):')
+    for name, opcode in sorted(config['opcodes'].items(), key=lambda item: item[1]):
+        lines.append('    %s = %d' % (name.upper(), opcode))
+    lines.append('')
+
+    lengths = dict((int(packet_id), length) for packet_id, length in config['sensor group packet lengths'].items())
+    lines.append('# Sensor packet lengths in bytes, indexed by packet id; 0 for ids that are not packets')
+    lines.append('PACKET_LENGTHS = (')
+    row = []
+    for packet_id in range(max(lengths) + 1):
+        row.append('%d,' % lengths.get(packet_id, 0))
+        if len(row) == 16:
+            lines.append('    ' + ' '.join(row))
+            row = []
+    if row:
+        lines.append('    ' + ' '.join(row))
+    lines.append('    )')
+    lines.append('')
+
+    midi = config['midi table']
+    lines.append('# Note name -> MIDI note number')
+    lines.append('MIDI_TABLE = MappingProxyType({')
+    for note in sorted(midi, key=lambda note: (midi[note], note)):
+        lines.append('    %r: %d,' % (note, midi[note]))
+    lines.append('    })')
+    lines.append('')
+
+    ascii = config['ascii table']
+    codes = [0] * 128
+    for char, code in ascii.items():
+        codes[ord(char)] = code
+    lines.append('# Digit LED code, indexed by character code; 0 for characters the display can\'t show')
+    lines.append('ASCII_TABLE = bytes((')
+    for start in range(0, 128, 16):
+        lines.append('    ' + ' '.join('%d,' % code for code in codes[start:start+16]))
+    lines.append('    ))')
+    lines.append('')
+
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Generate constants.py from config.json')
+    parser.add_argument('--check', action='store_true', help='exit 1 if constants.py is out of date, instead of rewriting it')
+    args = parser.parse_args()
+
+    with open(os.path.join(HERE, 'config.json')) as f:
+        source = generate(json.load(f))
+
+    target = os.path.join(HERE, 'constants.py')
+
+    if args.check:
+        with open(target) as f:
+            if f.read() != source:
+                print('%s is out of date with config.json' % target)
+                exit(1)
+        exit(0)
+
+    with open(target, 'w') as f:
+        f.write(source)
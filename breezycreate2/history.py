@@ -0,0 +1,197 @@
+'''
+history.py - A short, timestamped history of the Create2's sensor values
+
+SensorHistory records chosen SensorState values every time new sensor data
+comes in, in preallocated arrays, and answers questions about the recent past
+without building any lists or dicts:
+
+    from breezycreate2 import Robot
+    from breezycreate2.history import SensorHistory
+
+    bot = Robot()
+    history = SensorHistory(('bump_left', 'wall_signal')).attach(bot)
+    bot.startStream()
+    ...
+    if history.getMax('bump_left', .5):
+        print('bumped in the last half second')
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import threading
+from array import array
+
+from breezycreate2 import SensorState, _SENSOR_PACKETS, _SENSOR_SLOTS
+
+# Array typecode for each sensor packet format; flags are stored as 0 or 1
+_TYPECODES = {'?': 'B', 'B': 'B', 'b': 'b', 'H': 'H', 'h': 'h'}
+
+# SensorState attribute -> array typecode.  Bit properties like bump_left hold 0 or 1.
+_FIELD_TYPECODES = dict((_SENSOR_SLOTS[key], _TYPECODES[fmt]) for fmt, key in _SENSOR_PACKETS.values() if key is not None)
+
+# What the bump and cliff logic usually wants
+DEFAULT_FIELDS = ('bump_left', 'bump_right', 'cliff_left', 'cliff_front_left', 'cliff_front_right', 'cliff_right', 'wall_signal')
+
+class SensorHistory(object):
+    '''
+    Keeps the last capacity samples of each of the specified SensorState
+    attributes, with the time.monotonic() time each one came in.
+
+    Every array is twice capacity long, and each sample is written to both
+    halves, so the newest n samples are always contiguous.  That lets getLast()
+    and getWindow() return memoryviews straight into the arrays.  A view is only
+    good until the next sample comes in; hold history.lock while using one if
+    the robot is streaming.
+    '''
+
+    def __init__(self, fields=DEFAULT_FIELDS, capacity=256):
+
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.times = array('d', [0.]) * (2 * capacity)
+        self.columns = {}
+        for field in fields:
+            if field in _FIELD_TYPECODES:
+                typecode = _FIELD_TYPECODES[field]
+            elif isinstance(getattr(SensorState, field, None), property):
+                typecode = 'B'
+            else:
+                raise ValueError("'%s' is not a SensorState value" % field)
+            self.columns[field] = array(typecode, [0]) * (2 * capacity)
+        # Where the next sample goes in the first half, and how many samples there are
+        self.next = 0
+        self.count = 0
+
+    def attach(self, robot):
+        '''
+        Records a sample every time the Robot gets new sensor values; returns self.
+        '''
+        robot.addSensorListener(self.append)
+        return self
+
+    def detach(self, robot):
+        '''
+        Stops recording the Robot's sensor values.
+        '''
+        robot.removeSensorListener(self.append)
+
+    def append(self, sensors, timestamp, packet_ids=None):
+        '''
+        Records the values in a SensorState, received at the specified time.monotonic() time.
+        '''
+        with self.lock:
+            first = self.next
+            second = first + self.capacity
+            self.times[first] = self.times[second] = timestamp
+            for field, column in self.columns.items():
+                column[first] = column[second] = getattr(sensors, field)
+            self.next = (first + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def getTimes(self, n=None):
+        '''
+        Returns a memoryview of the times of the newest n samples (all of them by default), oldest first.
+        '''
+        start, end = self._span(n)
+        return memoryview(self.times)[start:end]
+
+    def getLast(self, field, n=None):
+        '''
+        Returns a memoryview of the newest n values of field (all of them by default), oldest first.
+        '''
+        start, end = self._span(n)
+        return memoryview(self.columns[field])[start:end]
+
+    def getValueAt(self, field, timestamp):
+        '''
+        Returns the value field had at the specified time: the one in the last sample
+        at or before it.  Returns None if that is older than the history.
+        '''
+        with self.lock:
+            start, end = self._span(None)
+            index = self._search(start, end, timestamp, True)
+            return self.columns[field][index - 1] if index > start else None
+
+    def getWindow(self, field, seconds, now=None):
+        '''
+        Returns a memoryview of the values of field from the last seconds before now
+        (by default, the time of the newest sample), oldest first.
+        '''
+        start, end = self._span(None)
+        if end > start:
+            if now is None:
+                now = self.times[end - 1]
+            start = self._search(start, end, now - seconds, False)
+            end = self._search(start, end, now, True)
+        return memoryview(self.columns[field])[start:end]
+
+    def getMin(self, field, seconds, now=None):
+        '''
+        Returns the smallest value of field from the last seconds before now, or None if there are none.
+        '''
+        with self.lock:
+            window = self.getWindow(field, seconds, now)
+            return min(window) if len(window) else None
+
+    def getMax(self, field, seconds, now=None):
+        '''
+        Returns the largest value of field from the last seconds before now, or None if there are none.
+        '''
+        with self.lock:
+            window = self.getWindow(field, seconds, now)
+            return max(window) if len(window) else None
+
+    def getMean(self, field, seconds, now=None):
+        '''
+        Returns the mean value of field from the last seconds before now, or None if there are none.
+        '''
+        with self.lock:
+            window = self.getWindow(field, seconds, now)
+            return sum(window) / float(len(window)) if len(window) else None
+
+    def _span(self, n):
+
+        # Start and end of the newest n samples in the arrays, which only wraps
+        # past the end of the first half into the copy in the second half
+        n = self.count if n is None else min(n, self.count)
+        end = self.next if self.next >= n else self.next + self.capacity
+        return end - n, end
+
+    def _search(self, start, end, timestamp, after):
+
+        # Index of the first sample in start:end later than timestamp (if after is
+        # True) or at or later than it (if after is False)
+        times = self.times
+        while start < end:
+            middle = (start + end) // 2
+            if times[middle] < timestamp or (after and times[middle] == timestamp):
+                start = middle + 1
+            else:
+                end = middle
+        return start
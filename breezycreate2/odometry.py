@@ -0,0 +1,200 @@
+'''
+odometry.py - Dead reckoning from the Create2's wheel encoders
+
+Odometry turns the raw encoder counts of packets 43 and 44 into a pose,
+one O(1) update per sensor frame, and keeps the recent poses so that the
+pose at any moment in between can be looked up:
+
+    from breezycreate2 import Robot
+    from breezycreate2.odometry import Odometry
+
+    bot = Robot()
+    odometry = Odometry().attach(bot)
+    bot.startStream((7, 9, 10, 11, 12, 27, 43, 44))
+    ...
+    print(odometry.getPose())
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import collections
+import math
+import threading
+
+from breezycreate2 import _WHEEL_BASE, _WHEEL_DIAMETER, _COUNTS_PER_REV
+
+# Where the robot was at a moment: timestamp in seconds from time.monotonic(), x and y
+# in mm, and theta in radians counterclockwise from the x axis when the odometry started
+Pose = collections.namedtuple('Pose', 'timestamp x y theta')
+
+# Packets and groups that bring both wheel encoder counts (43 and 44)
+_ENCODER_GROUPS = (100, 101)
+
+# Wheel travel per encoder count, in mm
+_MM_PER_COUNT = math.pi * _WHEEL_DIAMETER / _COUNTS_PER_REV
+
+class Odometry(object):
+    '''
+    Integrates the wheel encoder counts into a pose (x, y, theta), starting from
+    (0, 0, 0).  Theta is not wrapped, so it keeps counting up through whole turns
+    and poses interpolate smoothly.  The last history poses are kept for getPoseAt().
+    '''
+
+    def __init__(self, history=256):
+
+        self.lock = threading.Lock()
+        # Where the first update puts the robot
+        self.start = (0., 0., 0.)
+        self.left = None
+        self.right = None
+        self.pose = None
+        # Ring buffer of the recent poses; next is where the newest goes
+        self.history = history
+        self.poses = [None] * history
+        self.next = 0
+        self.count = 0
+
+    def attach(self, robot):
+        '''
+        Has the Robot's sensor updates drive this odometry; returns self.  The robot
+        has to be polling or streaming packets 43 and 44 for the pose to change.
+        '''
+        robot.addSensorListener(self._listen)
+        return self
+
+    def detach(self, robot):
+        '''
+        Stops following the Robot's sensor updates.
+        '''
+        robot.removeSensorListener(self._listen)
+
+    def reset(self, x=0., y=0., theta=0.):
+        '''
+        Starts over from the specified pose, forgetting the pose history.
+        '''
+        with self.lock:
+            self.start = (x, y, theta)
+            self.poses = [None] * self.history
+            self.next = 0
+            self.count = 0
+            if self.pose is not None:
+                self.pose = Pose(self.pose.timestamp, x, y, theta)
+                self._record(self.pose)
+
+    def update(self, left_counts, right_counts, timestamp):
+        '''
+        Moves the pose by the wheel travel since the previous update.  The counts are
+        the raw 16-bit encoder values, which roll over, so updates must come often
+        enough that neither wheel turns more than half the count range in between.
+        '''
+        with self.lock:
+
+            if self.pose is None:
+                x, y, theta = self.start
+                self.pose = Pose(timestamp, x, y, theta)
+
+            else:
+                # Signed difference of two 16-bit counters, allowing for rollover
+                left = (((left_counts - self.left + 0x8000) & 0xFFFF) - 0x8000) * _MM_PER_COUNT
+                right = (((right_counts - self.right + 0x8000) & 0xFFFF) - 0x8000) * _MM_PER_COUNT
+
+                distance = (left + right) / 2
+                turn = (right - left) / _WHEEL_BASE
+
+                # Move along the heading halfway through the turn
+                _, x, y, theta = self.pose
+                heading = theta + turn / 2
+                self.pose = Pose(timestamp, x + distance * math.cos(heading), y + distance * math.sin(heading), theta + turn)
+
+            self.left = left_counts
+            self.right = right_counts
+            self._record(self.pose)
+
+    def getPose(self):
+        '''
+        Returns the newest Pose, or None before the first encoder counts come in.
+        '''
+        return self.pose
+
+    def getPoseAt(self, timestamp):
+        '''
+        Returns the Pose at the specified time.monotonic() timestamp, interpolated
+        between the two recorded poses around it; or None if it is outside the history.
+        '''
+        with self.lock:
+
+            if not self.count:
+                return None
+
+            oldest = (self.next - self.count) % self.history
+
+            # Binary search for the first pose at or after timestamp
+            lo = 0
+            hi = self.count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.poses[(oldest + mid) % self.history].timestamp < timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+
+            if lo == self.count:
+                return None
+
+            after = self.poses[(oldest + lo) % self.history]
+            if after.timestamp == timestamp:
+                return after
+            if lo == 0:
+                return None
+
+            before = self.poses[(oldest + lo - 1) % self.history]
+            fraction = (timestamp - before.timestamp) / (after.timestamp - before.timestamp)
+
+            return Pose(timestamp,
+                        before.x + fraction * (after.x - before.x),
+                        before.y + fraction * (after.y - before.y),
+                        before.theta + fraction * (after.theta - before.theta))
+
+    def getPoses(self):
+        '''
+        Returns the recorded poses, oldest first.
+        '''
+        with self.lock:
+            oldest = self.next - self.count
+            return [self.poses[(oldest + k) % self.history] for k in range(self.count)]
+
+    def _record(self, pose):
+
+        self.poses[self.next] = pose
+        self.next = (self.next + 1) % self.history
+        if self.count < self.history:
+            self.count += 1
+
+    def _listen(self, sensors, timestamp, packet_ids):
+
+        # Reads without the encoders leave their counts as they were (zero before the
+        # first), which would look like the wheels jumping
+        if (43 in packet_ids and 44 in packet_ids) or any(group in packet_ids for group in _ENCODER_GROUPS):
+            self.update(sensors.left_encoder_counts, sensors.right_encoder_counts, timestamp)
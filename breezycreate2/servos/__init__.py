@@ -0,0 +1,49 @@
+'''
+breezycreate2.servos - Driver and controller for the servos on a PCA9685 board
+
+roboservos.py and adjustservos.py both build on this package:
+
+    pca9685.py      PCA9685, the chip driver, with openBus() for the Raspberry
+                    Pi's I2C bus and FakeBus for running without one
+    calibration.py  Calibration, loadCalibration(), and saveCalibration(), the
+                    per-channel servo limits kept in a file
+    controller.py   Servo and ServoController, and the non-blocking CommandQueue
+    motion.py       MotionEngine, for timed trajectories
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+from breezycreate2.servos.pca9685 import PCA9685, FakeBus, ChannelStats, openBus
+from breezycreate2.servos.calibration import Calibration, loadCalibration, saveCalibration, isCurrent
+
+def __getattr__(name):
+    # The controller and motion engine pull in numpy, so only import them when asked for
+    if name in ('Servo', 'ServoController', 'CommandQueue'):
+        from breezycreate2.servos import controller
+        return getattr(controller, name)
+    if name in ('MotionEngine', 'LINEAR', 'TRAPEZOIDAL', 'MIN_JERK'):
+        from breezycreate2.servos import motion
+        return getattr(motion, name)
+    raise AttributeError("module 'breezycreate2.servos' has no attribute '%s'" % name)
@@ -0,0 +1,96 @@
+'''
+calibration.py - Per-channel servo limits, loaded from a file
+
+A calibration file is a JSON object keyed by PCA9685 channel, giving each
+servo's name, the pulse-width limits it can safely move between, and the pulse
+width it starts at.  Once a servo has been swept through its limits, "swept"
+records them, so the sweep can be skipped until the limits change:
+
+    {
+        "13": {"name": "base_v_angle", "min": 570, "max": 2280, "default": 1660, "swept": [570, 2280]},
+        "12": {"name": "arm_v_angle", "min": 530, "max": 1510, "default": 1010}
+    }
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import collections
+import json
+import os
+
+# One servo's calibration; the values are pulse widths in usec, and swept is the
+# (range_min, range_max) the servo was last swept through, or None if it never was
+Calibration = collections.namedtuple('Calibration', 'channel name range_min range_max default_value swept', defaults=(None,))
+
+def loadCalibration(filename):
+    '''
+    Returns the calibration in a file, as a dict of channel: Calibration in the
+    order the file lists them.  Raises ValueError for a channel the PCA9685
+    doesn't have or a default outside its limits.
+    '''
+    with open(filename) as f:
+        entries = json.load(f)
+
+    calibration = collections.OrderedDict()
+    for key, entry in entries.items():
+        channel = int(key)
+        swept = entry.get('swept')
+        servo = Calibration(channel, entry['name'], int(entry['min']), int(entry['max']), int(entry['default']),
+                            tuple(swept) if swept is not None else None)
+        _check(filename, servo)
+        calibration[channel] = servo
+    return calibration
+
+def saveCalibration(filename, calibration):
+    '''
+    Writes a dict of channel: Calibration to a file, one channel to a line.  The
+    file is replaced in one step, so a crash can't leave half of it behind.
+    Raises ValueError, writing nothing, if loadCalibration() would reject any of it.
+    '''
+    lines = []
+    for channel, servo in calibration.items():
+        _check(filename, servo)
+        entry = collections.OrderedDict((('name', servo.name), ('min', servo.range_min), ('max', servo.range_max), ('default', servo.default_value)))
+        if servo.swept is not None:
+            entry['swept'] = list(servo.swept)
+        lines.append('    %s: %s' % (json.dumps(str(channel)), json.dumps(entry)))
+
+    temporary = filename + '.tmp'
+    with open(temporary, 'w') as f:
+        f.write('{\n' + ',\n'.join(lines) + '\n}\n')
+    os.replace(temporary, filename)
+
+def _check(filename, servo):
+
+    if not 0 <= servo.channel < 16:
+        raise ValueError('%s: no channel %d on the PCA9685' % (filename, servo.channel))
+    if not servo.range_min <= servo.default_value <= servo.range_max:
+        raise ValueError('%s: %s default %d is outside %d..%d' % (filename, servo.name, servo.default_value, servo.range_min, servo.range_max))
+
+def isCurrent(servo):
+    '''
+    Returns True if a servo has been swept through the limits in its Calibration.
+    '''
+    return servo.swept == (servo.range_min, servo.range_max)
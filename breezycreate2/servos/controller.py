@@ -0,0 +1,182 @@
+'''
+controller.py - A set of calibrated servos on one PCA9685
+
+ServoController builds a Servo for every channel in a calibration, and moves
+them three ways: moveTo() along timed trajectories on its MotionEngine,
+setPose() and Servo.syncServoValue() through its CommandQueue, which returns
+at once and writes on its own thread, and syncAllServos(), which writes
+straight away:
+
+    from breezycreate2.servos import ServoController, loadCalibration
+
+    controller = ServoController(loadCalibration('servos.json'))
+    controller.syncAllServos()
+    controller.moveTo({'claw': 1400}, duration=.5)
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import threading
+
+from breezycreate2.servos.pca9685 import PCA9685
+from breezycreate2.servos.motion import MotionEngine, LINEAR, TRAPEZOIDAL, MIN_JERK
+
+class Servo:
+
+    __SERVO_SPEED        = 500    # units per second for servoTestRange()
+
+    def __init__(self, servo_id, range_max, range_min, name, default_value, controller):
+        self.range_max = range_max
+        self.range_min = range_min
+        self.servo_id = servo_id
+        self.name = name
+        self.default_value = default_value
+        self.currentValue = default_value
+        self.controller = controller
+
+    def servoOffset(self, offset):
+        previewValue = self.currentValue + offset
+        if previewValue > self.range_max:
+            self.currentValue = self.range_max
+        elif previewValue < self.range_min:
+            self.currentValue = self.range_min
+        else:
+            self.currentValue = previewValue
+
+    def syncServoValue(self):
+        "Queues the current value for the servo, without waiting for the bus"
+        self.controller.commands.put({self.servo_id: self.currentValue})
+
+    def servoTestRange(self):
+        print(f"Performing servo test on {self.name} - Channel {self.servo_id} - Max: {self.range_max} - Min: {self.range_min}")
+
+        motion = self.controller.motion
+        for value in (self.range_min, self.range_max, self.range_min):
+            motion.move({self.name: value}, speed=self.__SERVO_SPEED, profile=LINEAR)
+            motion.wait()
+
+        self.currentValue = self.default_value
+        self.syncServoValue()
+
+class CommandQueue(threading.Thread):
+    "Writes servo pulses on its own thread, so callers never wait on the I2C bus; pulses queued for a channel before the thread gets to them are merged, the newest winning"
+
+    def __init__(self, pwm):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.pwm = pwm
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.writing = False
+        self.running = True
+        self.queued = 0     # pulses put()
+        self.merged = 0     # pulses replaced by a newer one before they were written
+
+    def put(self, pulses):
+        "Queues a dict of channel: pulse to be written, and returns at once"
+        with self.condition:
+            for channel, pulse in pulses.items():
+                if channel in self.pending:
+                    self.merged += 1
+                self.pending[channel] = pulse
+            self.queued += len(pulses)
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        "Waits until everything queued has been written; returns False if timeout seconds passed first"
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.writing, timeout)
+
+    def stop(self):
+        "Writes whatever is queued, then stops the thread"
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.pending:
+                    return
+                pulses = self.pending
+                self.pending = {}
+                self.writing = True
+            try:
+                self.pwm.setServoPulses(pulses)
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+class ServoController:
+
+    __TEST_SPEED         = 500    # units per second for testAllRanges()
+
+    def __init__(self, calibration, bus=None, rate=50, address=0x40):
+        "Builds a Servo for each Calibration in a dict of channel: Calibration, and a MotionEngine moving them rate times a second"
+        self.pwm = PCA9685(address, debug=False, bus=bus)
+        self.pwm.setPWMFreq(50)
+
+        self.servos = dict((servo.name, Servo(channel, servo.range_max, servo.range_min, servo.name, servo.default_value, controller=self))
+                           for channel, servo in calibration.items())
+        self.allMotors = list(self.servos.values())
+
+        self.commands = CommandQueue(self.pwm)
+        self.commands.start()
+
+        # One thread moves all the servos, rate times a second
+        self.motion = MotionEngine(self.pwm, self.allMotors, rate)
+        self.motion.start()
+
+    def syncAllServos(self):
+        "Sends every servo's current value in as few I2C writes as possible"
+        self.pwm.setServoPulses(dict((servo.servo_id, servo.currentValue) for servo in self.allMotors))
+
+    def testAllRanges(self, names=None):
+        "Sweeps every servo, or just the named ones, through its range and back to its default, all at the same time"
+        motors = self.allMotors if names is None else [self.servos[name] for name in names]
+        print("Performing servo test on " + ("all servos" if names is None else ", ".join(names)))
+        for limit in ('range_min', 'range_max'):
+            self.moveTo(dict((servo.name, getattr(servo, limit)) for servo in motors), speed=self.__TEST_SPEED, profile=TRAPEZOIDAL)
+        self.moveTo(dict((servo.name, servo.default_value) for servo in motors), speed=self.__TEST_SPEED, profile=TRAPEZOIDAL)
+
+    def moveTo(self, pose, duration=None, speed=None, profile=MIN_JERK, wait=True):
+        "Moves servos smoothly to a pose, a dict of servo name: value, together, over duration seconds or at speed units per second (give one of them)"
+        self.motion.move(pose, duration, speed, profile)
+        if wait:
+            self.motion.wait()
+
+    def setPose(self, pose):
+        "Queues a pose, a dict of servo name: value, each clamped to the servo's range, to be written all at once"
+        for servo in self.allMotors:
+            if servo.name in pose:
+                servo.currentValue = max(servo.range_min, min(servo.range_max, pose[servo.name]))
+        self.commands.put(dict((servo.servo_id, servo.currentValue) for servo in self.allMotors))
+
+    def getChannelStats(self):
+        "Returns a dict of servo name: ChannelStats for the I2C writes to each servo's channel"
+        return dict((servo.name, self.pwm.getChannelStats(servo.servo_id)) for servo in self.allMotors)
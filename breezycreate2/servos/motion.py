@@ -0,0 +1,158 @@
+'''
+motion.py - Timed trajectories for many servos at once
+
+MotionEngine moves servos from where they are to target pulse widths along
+linear, trapezoidal, or minimum-jerk profiles, all on one fixed-rate thread
+that writes every moving channel each tick.  ServoController starts one and
+uses it for moveTo(), so most programs never need it directly.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import threading
+import time
+import numpy as np
+
+# Motion profiles, giving how far along a move is from how much of its time has gone by
+LINEAR       = 0      # constant speed
+TRAPEZOIDAL  = 1      # speed up, cruise, slow down
+MIN_JERK     = 2      # smoothest start and stop
+
+class MotionEngine(threading.Thread):
+    "Moves servos along timed trajectories, with one fixed-rate thread writing every moving channel each tick"
+
+    __RAMP               = 0.25   # fraction of a trapezoidal move spent speeding up, and again slowing down
+
+    def __init__(self, pwm, servos, rate=50):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.pwm = pwm
+        self.servos = list(servos)
+        self.index = dict((servo.name, k) for k, servo in enumerate(self.servos))
+        self.period = 1.0 / rate
+        self.condition = threading.Condition()
+        self.running = True
+        # One entry per servo for the move it is making
+        count = len(self.servos)
+        self.start_value = np.zeros(count)
+        self.delta = np.zeros(count)
+        self.start_time = np.zeros(count)
+        self.duration = np.ones(count)
+        self.profile = np.zeros(count, dtype=int)
+        self.moving = np.zeros(count, dtype=bool)
+        # How late the ticks have been, in seconds
+        self.ticks = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def move(self, pose, duration=None, speed=None, profile=MIN_JERK):
+        "Starts moving servos to a pose, a dict of servo name: value, each clamped to the servo's range, taking duration seconds, or moving at speed units per second"
+        if (duration is None) == (speed is None):
+            raise ValueError('Give a move either a duration or a speed')
+        if (duration is not None and duration < 0) or (speed is not None and speed <= 0):
+            raise ValueError('A move needs a duration of at least 0, or a speed above 0')
+        now = time.monotonic()
+        with self.condition:
+            for name, target in pose.items():
+                k = self.index[name]
+                servo = self.servos[k]
+                target = max(servo.range_min, min(servo.range_max, target))
+                self.start_value[k] = servo.currentValue
+                self.delta[k] = target - servo.currentValue
+                self.start_time[k] = now
+                self.duration[k] = max(self.period, duration if duration is not None else abs(self.delta[k]) / float(speed))
+                self.profile[k] = profile
+                self.moving[k] = True
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        "Waits until no servo is moving; returns False if timeout seconds passed first"
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.moving.any(), timeout)
+
+    def stop(self):
+        "Stops the thread; servos stay where they are"
+        with self.condition:
+            self.running = False
+            self.moving[:] = False
+            self.condition.notify_all()
+        self.join()
+
+    def run(self):
+        next_tick = time.monotonic()
+        while True:
+            with self.condition:
+                while self.running and not self.moving.any():
+                    self.condition.wait()
+                    next_tick = time.monotonic()
+                if not self.running:
+                    return
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.monotonic()
+            self.__count(now - next_tick)
+            # Keep to the tick schedule, but skip ticks we have missed instead of bunching them up
+            next_tick += self.period
+            if next_tick < now:
+                next_tick = now + self.period
+            with self.condition:
+                self.__tick(now)
+
+    def __tick(self, now):
+        moving = np.flatnonzero(self.moving)
+        fraction = np.clip((now - self.start_time[moving]) / self.duration[moving], 0.0, 1.0)
+        values = np.rint(self.start_value[moving] + self.delta[moving] * self.__shape(self.profile[moving], fraction)).astype(int)
+        pulses = {}
+        for k, value in zip(moving, values):
+            servo = self.servos[k]
+            servo.currentValue = int(value)
+            pulses[servo.servo_id] = servo.currentValue
+        self.pwm.setServoPulses(pulses)
+        self.moving[moving[fraction >= 1.0]] = False
+        if not self.moving.any():
+            self.condition.notify_all()
+
+    def __shape(self, profile, t):
+        s = t.copy()
+        trapezoidal = profile == TRAPEZOIDAL
+        if trapezoidal.any():
+            ramp = self.__RAMP
+            peak = 1.0 / (1.0 - ramp)
+            u = t[trapezoidal]
+            s[trapezoidal] = np.where(u < ramp, peak * u * u / (2 * ramp),
+                                              np.where(u > 1.0 - ramp, 1.0 - peak * (1.0 - u) ** 2 / (2 * ramp),
+                                                                peak * (u - ramp / 2)))
+        min_jerk = profile == MIN_JERK
+        if min_jerk.any():
+            u = t[min_jerk]
+            s[min_jerk] = u ** 3 * (10.0 - 15.0 * u + 6.0 * u * u)
+        return s
+
+    def __count(self, lateness):
+        lateness = max(0.0, lateness)
+        self.ticks += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
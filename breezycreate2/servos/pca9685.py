@@ -0,0 +1,265 @@
+'''
+pca9685.py - Driver for the PCA9685 16-channel PWM servo controller
+
+PCA9685 talks to the chip through a bus object with the smbus.SMBus methods it
+uses (write_byte_data, write_i2c_block_data, read_byte_data).  openBus() opens
+the Raspberry Pi's I2C bus; FakeBus keeps the registers in memory instead, for
+running without the hardware:
+
+    from breezycreate2.servos import PCA9685, FakeBus
+
+    pwm = PCA9685(0x40, bus=FakeBus())
+    pwm.setPWMFreq(50)
+    pwm.setServoPulses({0: 1500, 1: 1200})
+    print(pwm.getChannelStats(0))
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import collections
+import math
+import threading
+import time
+try:
+    import smbus
+except ImportError: # not on a Raspberry Pi; pass PCA9685 a FakeBus instead
+    smbus = None
+
+# I2C traffic for one channel: bus transactions that wrote its registers, and their mean and longest times
+ChannelStats = collections.namedtuple('ChannelStats', 'transactions mean_usec max_usec')
+
+def openBus(number=1):
+    '''
+    Returns the smbus.SMBus for the specified I2C bus (1 on every recent Raspberry Pi).
+    '''
+    if smbus is None:
+        raise ImportError('PCA9685 needs the smbus module to use the I2C bus; pass bus=FakeBus() to run without it')
+    return smbus.SMBus(number)
+
+class FakeBus(object):
+    '''
+    Stands in for smbus.SMBus: keeps the registers, and counts what goes over the bus.
+    '''
+
+    def __init__(self):
+        self.registers = bytearray(256)
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def count(self, data_bytes):
+        # Address and register bytes, plus the data
+        self.transactions += 1
+        self.bytes += 2 + data_bytes
+
+    def write_byte_data(self, address, reg, value):
+        self.registers[reg] = value
+        self.count(1)
+
+    def write_i2c_block_data(self, address, reg, values):
+        self.registers[reg:reg+len(values)] = bytearray(values)
+        self.count(len(values))
+
+    def read_byte_data(self, address, reg):
+        # A register read is a write of the register number, then a read of the byte
+        self.transactions += 1
+        self.bytes += 4
+        return self.registers[reg]
+
+class PCA9685:
+
+    # Registers/etc.
+    __SUBADR1            = 0x02
+    __SUBADR2            = 0x03
+    __SUBADR3            = 0x04
+    __MODE1              = 0x00
+    __PRESCALE           = 0xFE
+    __LED0_ON_L          = 0x06
+    __LED0_ON_H          = 0x07
+    __LED0_OFF_L         = 0x08
+    __LED0_OFF_H         = 0x09
+    __ALLLED_ON_L        = 0xFA
+    __ALLLED_ON_H        = 0xFB
+    __ALLLED_OFF_L       = 0xFC
+    __ALLLED_OFF_H       = 0xFD
+    __MODE1_AI           = 0x20   # register auto-increment
+    __BLOCK_MAX          = 32     # bytes in one SMBus block write
+    __CHANNELS           = 16
+
+    def __init__(self, address=0x40, debug=False, bus=None):
+        self.bus = bus if bus is not None else openBus(1)
+        self.address = address
+        self.debug = debug
+        # The motion and command threads share the chip
+        self.lock = threading.Lock()
+        # Shadow copy of the chip's registers, and which of them we know, so that writes
+        # that change nothing can be skipped and reads answered without the bus.  The
+        # chip changes MODE1 (RESTART, SLEEP) on its own, so that one always goes to the chip.
+        self.shadow = bytearray(256)
+        self.known = bytearray(256)
+        self.skipped = 0    # register bytes not written because they already held the value
+        self.resetStats()
+        if (self.debug):
+            print("Reseting PCA9685")
+        # Auto-increment lets one block write fill all four LED registers of a channel, or several channels
+        self.write(self.__MODE1, self.__MODE1_AI)
+
+    def write(self, reg, value):
+        "Writes an 8-bit value to the specified register/address, unless it already holds it"
+        with self.lock:
+            if reg != self.__MODE1 and self.known[reg] and self.shadow[reg] == value:
+                self.skipped += 1
+                return
+            self.__send(reg, [value])
+        if (self.debug):
+            print("I2C: Write 0x%02X to register 0x%02X" % (value, reg))
+
+    def read(self, reg):
+        "Read an unsigned byte from the I2C device, or from the shadow if we know what it holds"
+        with self.lock:
+            if reg != self.__MODE1 and self.known[reg]:
+                return self.shadow[reg]
+            result = self.bus.read_byte_data(self.address, reg)
+            self.__remember(reg, [result & 0xFF])
+        if (self.debug):
+            print("I2C: Device 0x%02X returned 0x%02X from reg 0x%02X" % (self.address, result & 0xFF, reg))
+        return result
+
+    def forget(self):
+        "Empties the shadow, so the next writes all go to the chip; for after it has been reset behind our back"
+        with self.lock:
+            self.known[:] = bytearray(256)
+
+    def resetStats(self):
+        "Zeroes the per-channel transaction counts and times"
+        self.transactions = [0] * self.__CHANNELS
+        self.seconds = [0.] * self.__CHANNELS
+        self.slowest = [0.] * self.__CHANNELS
+
+    def getChannelStats(self, channel):
+        "Returns a ChannelStats for the writes to a channel since the driver started or resetStats()"
+        count = self.transactions[channel]
+        return ChannelStats(count, 1e6 * self.seconds[channel] / count if count else 0., 1e6 * self.slowest[channel])
+
+    def __send(self, reg, values):
+        # One bus transaction, timed and counted against every channel whose registers it writes
+        start = time.perf_counter()
+        if len(values) == 1:
+            self.bus.write_byte_data(self.address, reg, values[0])
+        else:
+            self.bus.write_i2c_block_data(self.address, reg, values)
+        elapsed = time.perf_counter() - start
+        self.__remember(reg, values)
+        first = max(reg, self.__LED0_ON_L) - self.__LED0_ON_L
+        last = min(reg + len(values), self.__LED0_ON_L + 4 * self.__CHANNELS) - self.__LED0_ON_L
+        for channel in range(first // 4, (last + 3) // 4):
+            self.transactions[channel] += 1
+            self.seconds[channel] += elapsed
+            self.slowest[channel] = max(self.slowest[channel], elapsed)
+
+    def __remember(self, reg, values):
+        self.shadow[reg:reg+len(values)] = bytearray(values)
+        self.known[reg:reg+len(values)] = b'\x01' * len(values)
+        # The ALL_LED registers write every channel's registers, which we don't read back
+        if reg + len(values) > self.__ALLLED_ON_L and reg <= self.__ALLLED_OFF_H:
+            self.known[self.__LED0_ON_L:self.__LED0_ON_L+64] = bytearray(64)
+
+    def setPWMFreq(self, freq):
+        "Sets the PWM frequency"
+        prescaleval = 25000000.0    # 25MHz
+        prescaleval /= 4096.0       # 12-bit
+        prescaleval /= float(freq)
+        prescaleval -= 1.0
+        if (self.debug):
+            print("Setting PWM frequency to %d Hz" % freq)
+            print("Estimated pre-scale: %d" % prescaleval)
+        prescale = math.floor(prescaleval + 0.5)
+        if (self.debug):
+            print("Final pre-scale: %d" % prescale)
+
+        oldmode = self.read(self.__MODE1);
+        newmode = (oldmode & 0x7F) | 0x10        # sleep
+        self.write(self.__MODE1, newmode)        # go to sleep
+        self.write(self.__PRESCALE, int(math.floor(prescale)))
+        self.write(self.__MODE1, oldmode)
+        time.sleep(0.005)
+        self.write(self.__MODE1, oldmode | 0x80)
+
+    def writeBlock(self, reg, values):
+        "Writes a list of 8-bit values to consecutive registers, starting at the specified one, skipping the ends that already hold them"
+        with self.lock:
+            first = 0
+            last = len(values)
+            while first < last and reg + first != self.__MODE1 and self.known[reg+first] and self.shadow[reg+first] == values[first]:
+                first += 1
+            while last > first and reg + last - 1 != self.__MODE1 and self.known[reg+last-1] and self.shadow[reg+last-1] == values[last-1]:
+                last -= 1
+            self.skipped += len(values) - (last - first)
+            if first == last:
+                return
+            reg += first
+            values = values[first:last]
+            self.__send(reg, values)
+        if (self.debug):
+            print("I2C: Write %s to registers 0x%02X-0x%02X" % (" ".join("0x%02X" % value for value in values), reg, reg + len(values) - 1))
+
+    def setPWM(self, channel, on, off):
+        "Sets a single PWM channel"
+        self.writeBlock(self.__LED0_ON_L+4*channel, [on & 0xFF, on >> 8, off & 0xFF, off >> 8])
+        if (self.debug):
+            print("channel: %d  LED_ON: %d LED_OFF: %d" % (channel,on,off))
+
+    def setPWMs(self, pwms):
+        "Sets several PWM channels from a dict of channel: (on, off), with one write per run of up to 8 consecutive channels"
+        channels = sorted(pwms)
+        run = []
+        for channel in channels:
+            if run and (channel != run[-1] + 1 or 4 * len(run) == self.__BLOCK_MAX):
+                self.__writeRun(run, pwms)
+                run = []
+            run.append(channel)
+        if run:
+            self.__writeRun(run, pwms)
+
+    def __writeRun(self, run, pwms):
+        values = []
+        for channel in run:
+            on, off = pwms[channel]
+            values += [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+        self.writeBlock(self.__LED0_ON_L+4*run[0], values)
+
+    def setServoPulse(self, channel, pulse):
+        "Sets the Servo Pulse,The PWM frequency must be 50HZ"
+        pulse = pulse*4096/20000        #PWM frequency is 50HZ,the period is 20000us
+        self.setPWM(channel, 0, int(pulse))
+
+    def setServoPulses(self, pulses):
+        "Sets several Servo Pulses at once from a dict of channel: pulse; the PWM frequency must be 50HZ"
+        self.setPWMs(dict((channel, (0, int(pulse*4096/20000))) for channel, pulse in pulses.items()))
+
+    def allServos(self, pulse):
+        self.setServoPulses(dict((i, pulse) for i in range(0, 15)))
@@ -0,0 +1,351 @@
+'''
+simulator.py - A simulated Create2 that speaks the Open Interface byte protocol
+
+SimulatedCreate2 looks like a serial port to the rest of BreezyCreate2, so the
+package can be run, tested, and benchmarked without a robot:
+
+    from breezycreate2 import Robot
+    from breezycreate2.simulator import SimulatedCreate2
+
+    bot = Robot(transport=SimulatedCreate2())
+
+For programs that need a real tty (like AsyncRobot), openPty() serves a
+simulated robot on a pseudo-terminal and returns its device name.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import math
+import os
+import select
+import struct
+import threading
+import time
+import tty
+
+from breezycreate2 import _packet_length, _SENSOR_DECODERS, SensorState, _WHEEL_BASE, _WHEEL_DIAMETER, _COUNTS_PER_REV
+from breezycreate2.constants import Opcode
+
+# Number of data bytes after each opcode, for the commands with a fixed length
+_COMMAND_LENGTHS = {
+    'start': 0, 'reset': 0, 'stop': 0, 'baud': 1, 'safe': 0, 'full': 0,
+    'clean': 0, 'max': 0, 'spot': 0, 'seek_dock': 0, 'power': 0,
+    'schedule': 15, 'set_day_time': 3,
+    'drive': 4, 'drive_direct': 4, 'drive_pwm': 4, 'motors': 1, 'motors_pwm': 3,
+    'led': 3, 'scheduling_led': 2, 'digit_led_raw': 4, 'buttons': 1, 'digit_led_ascii': 4,
+    'play': 1, 'sensors': 1, 'pause_resume_stream': 1,
+    }
+
+# OI modes
+_OFF, _PASSIVE, _SAFE, _FULL = range(4)
+
+# Stream frames go out every 15 msec
+_STREAM_PERIOD = .015
+
+# Encoder counts per mm of wheel travel
+_COUNTS_PER_MM = _COUNTS_PER_REV / (math.pi * _WHEEL_DIAMETER)
+
+class SimulatedCreate2(object):
+    '''
+    A Create2 in a square arena, driven by the bytes written to it.  It has the
+    parts of the serial.Serial interface that BreezyCreate2 uses.
+
+    Drive commands move the robot (in safe or full mode) and turn its encoders;
+    it bumps when it reaches the arena's edge, and the wall signal rises as the
+    robot nears the edge.  Sensor requests, query lists, and streams are answered
+    with correctly framed packets; songs, LEDs and the rest are recorded.
+    '''
+
+    def __init__(self, arena=2000.):
+        '''
+        Makes a simulated robot at the middle of an arena that is arena mm on a side.
+        '''
+        self.port = None
+        self.baudrate = None
+        self.timeout = None
+        self.is_open = False
+        self.arena = arena
+        self.lock = threading.Lock()
+        self.input = bytearray()
+        self.output = bytearray()
+        self.opcodes = dict((int(opcode), opcode.name.lower()) for opcode in Opcode)
+        self.sensors = SensorState()
+        self.sensors.voltage = 16000
+        self.sensors.temperature = 25
+        self.sensors.battery_charge = 2500
+        self.sensors.battery_capacity = 3000
+        # Pose in mm and radians, wheel speeds in mm/sec
+        self.x = 0.
+        self.y = 0.
+        self.theta = 0.
+        self.left_speed = 0.
+        self.right_speed = 0.
+        # Distance and angle since they were last read, and unreported encoder fractions
+        self.distance = 0.
+        self.angle = 0.
+        self.left_counts = 0.
+        self.right_counts = 0.
+        self.songs = {}
+        self.song_end = 0.
+        self.digits = b'    '
+        self.stream_ids = ()
+        self.streaming = False
+        self.next_frame = 0.
+        self.commands = 0
+        self.updated = time.monotonic()
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def isOpen(self):
+        return self.is_open
+
+    def fileno(self):
+        raise OSError('SimulatedCreate2 has no file descriptor; use openPty()')
+
+    @property
+    def in_waiting(self):
+        with self.lock:
+            self._stream(time.monotonic())
+            return len(self.output)
+
+    def reset_input_buffer(self):
+        with self.lock:
+            del self.output[:]
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        '''
+        Takes the bytes of one or more OI commands.
+        '''
+        with self.lock:
+            # Add the frames already due first, so they show the robot as it was before these
+            # commands, and the simulated time never has to step back to send them
+            now = time.monotonic()
+            self._stream(now)
+            self.input += data
+            self._parse(now)
+        return len(data)
+
+    def read(self, size=1):
+        '''
+        Returns up to size bytes of sensor data.  While streaming, waits up to timeout
+        seconds (forever if timeout is None) for enough frames to come in.
+        '''
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._stream(now)
+                if len(self.output) >= size or not self.streaming or (deadline is not None and now >= deadline):
+                    data = bytes(self.output[:size])
+                    del self.output[:size]
+                    return data
+                wait = self.next_frame - now
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            time.sleep(max(wait, 0))
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _parse(self, now):
+        # Run every complete command in the input
+        while self.input:
+            opcode = self.input[0]
+            name = self.opcodes.get(opcode)
+            if name is None:
+                del self.input[0]
+                continue
+            if name == 'song':
+                length = 2 + 2 * self.input[2] if len(self.input) > 2 else None
+            elif name in ('query_list', 'stream'):
+                length = 1 + self.input[1] if len(self.input) > 1 else None
+            else:
+                length = _COMMAND_LENGTHS[name]
+            if length is None or len(self.input) < 1 + length:
+                return
+            data = bytes(self.input[1:1+length])
+            del self.input[:1+length]
+            self.commands += 1
+            self._command(name, data, now)
+
+    def _command(self, name, data, now):
+        self._update(now)
+        if name == 'start':
+            self._set_mode(_PASSIVE)
+        elif name in ('reset', 'stop'):
+            self._set_mode(_OFF)
+        elif name == 'safe':
+            self._set_mode(_SAFE)
+        elif name == 'full':
+            self._set_mode(_FULL)
+        elif name in ('clean', 'max', 'spot', 'seek_dock', 'power'):
+            self._set_mode(_PASSIVE)
+        elif name == 'drive' and self.sensors.oi_mode >= _SAFE:
+            velocity, radius = struct.unpack('>hh', data)
+            self.sensors.requested_velocity = velocity
+            self.sensors.requested_radius = radius
+            self._set_wheels(velocity, radius)
+        elif name == 'drive_direct' and self.sensors.oi_mode >= _SAFE:
+            right, left = struct.unpack('>hh', data)
+            self.sensors.requested_right_velocity = right
+            self.sensors.requested_left_velocity = left
+            self.left_speed, self.right_speed = float(left), float(right)
+        elif name == 'song':
+            notes = data[2:]
+            self.songs[data[0]] = [(notes[i], notes[i+1]) for i in range(0, len(notes), 2)]
+        elif name == 'play' and data[0] in self.songs:
+            self.sensors.song_number = data[0]
+            self.song_end = now + sum(duration for _, duration in self.songs[data[0]]) / 64.
+        elif name in ('digit_led_ascii', 'digit_led_raw'):
+            self.digits = data
+        elif name == 'sensors' and _packet_length(data[0]):
+            self.output += self._pack(data[0])
+        elif name == 'query_list':
+            for packet_id in data[1:]:
+                if _packet_length(packet_id):
+                    self.output += self._pack(packet_id)
+        elif name == 'stream':
+            self.stream_ids = tuple(packet_id for packet_id in data[1:] if _packet_length(packet_id))
+            self.streaming = True
+            self.next_frame = now
+        elif name == 'pause_resume_stream':
+            self.streaming = bool(data[0]) and bool(self.stream_ids)
+            self.next_frame = now
+
+    def _set_mode(self, mode):
+        self.sensors.oi_mode = mode
+        self.left_speed = self.right_speed = 0.
+        if mode == _OFF:
+            self.streaming = False
+
+    def _set_wheels(self, velocity, radius):
+        if radius in (32767, -32768):
+            self.left_speed = self.right_speed = float(velocity)
+        elif radius == -1:
+            self.left_speed, self.right_speed = float(velocity), float(-velocity)
+        elif radius == 1:
+            self.left_speed, self.right_speed = float(-velocity), float(velocity)
+        else:
+            self.left_speed = velocity * (radius - _WHEEL_BASE / 2) / radius
+            self.right_speed = velocity * (radius + _WHEEL_BASE / 2) / radius
+
+    def _update(self, now):
+        # Move the robot along for the time since the last update
+        dt, self.updated = now - self.updated, now
+        left = self.left_speed * dt
+        right = self.right_speed * dt
+        center = (left + right) / 2
+        turn = (right - left) / _WHEEL_BASE
+        x = self.x + center * math.cos(self.theta + turn / 2)
+        y = self.y + center * math.sin(self.theta + turn / 2)
+        # Stop at the arena's edge; the bumpers stay pressed while the wheels push into it
+        edge = self.arena / 2
+        bumped = abs(x) > edge or abs(y) > edge
+        if bumped:
+            x = max(-edge, min(edge, x))
+            y = max(-edge, min(edge, y))
+        self.x, self.y = x, y
+        self.theta = (self.theta + turn) % (2 * math.pi)
+        self.distance += center
+        self.angle += math.degrees(turn)
+        self.left_counts += left * _COUNTS_PER_MM
+        self.right_counts += right * _COUNTS_PER_MM
+        sensors = self.sensors
+        sensors.left_encoder_counts = (sensors.left_encoder_counts + int(self.left_counts)) & 0xFFFF
+        sensors.right_encoder_counts = (sensors.right_encoder_counts + int(self.right_counts)) & 0xFFFF
+        self.left_counts -= int(self.left_counts)
+        self.right_counts -= int(self.right_counts)
+        sensors.wheel_drop_and_bumps = 0x03 if bumped else 0
+        sensors.stasis = center != 0
+        sensors.wall_signal = int(max(0., 1023. * (1 - (edge - max(abs(x), abs(y))) / 100.)))
+        sensors.wall_seen = sensors.wall_signal > 0
+        sensors.song_playing = now < self.song_end
+        sensors.number_of_stream_packets = len(self.stream_ids) if self.streaming else 0
+
+    def _pack(self, packet_id):
+        # Distance and angle report what happened since they were last read
+        sensors = self.sensors
+        packer, slots = _SENSOR_DECODERS[packet_id]
+        if 'distance' in slots:
+            sensors.distance = max(-32768, min(32767, int(self.distance)))
+            self.distance -= sensors.distance
+        if 'angle' in slots:
+            sensors.angle = max(-32768, min(32767, int(self.angle)))
+            self.angle -= sensors.angle
+        return packer.pack(*[getattr(sensors, slot) for slot in slots])
+
+    def _stream(self, now):
+        # Add a frame for every stream period that has gone by
+        while self.streaming and self.next_frame <= now:
+            self._update(self.next_frame)
+            body = bytearray()
+            for packet_id in self.stream_ids:
+                body.append(packet_id)
+                body += self._pack(packet_id)
+            frame = bytearray((19, len(body))) + body
+            frame.append(-sum(frame) & 0xFF)
+            self.output += frame
+            self.next_frame += _STREAM_PERIOD
+
+
+def openPty(simulator=None):
+    '''
+    Serves a simulated Create2 on a pseudo-terminal, from a background thread.
+    Returns the name of the terminal device to open in place of /dev/ttyACM0.
+    '''
+    simulator = simulator if simulator is not None else SimulatedCreate2()
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    name = os.ttyname(slave)
+    thread = threading.Thread(target=_serve_pty, args=(simulator, master))
+    thread.daemon = True
+    thread.start()
+    return name
+
+def _serve_pty(simulator, master):
+    while True:
+        ready, _, _ = select.select([master], [], [], _STREAM_PERIOD / 3)
+        if ready:
+            try:
+                data = os.read(master, 1024)
+            except OSError:
+                return
+            simulator.write(data)
+        with simulator.lock:
+            simulator._stream(time.monotonic())
+            data = bytes(simulator.output)
+            del simulator.output[:]
+        if data:
+            os.write(master, data)
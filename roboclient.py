@@ -6,7 +6,8 @@ roboclient.py
 Uses a joystick or other controller to send <X,Y,A> tuples to the create2server
 over a socket.
 
-X,Y are control axes (-1..+1); A is autopilot flag (0 or 1).
+X,Y are control axes (-1..+1); A is autopilot flag (0 or 1).  They are sent
+as the binary frames described in roboprotocol.py.
 
 The MIT License
 
@@ -31,14 +32,37 @@ THE SOFTWARE.
 '''
 
 import socket
+import threading
+import time
 import pygame
 
+from roboprotocol import packCommand, packHello, packDatagram, newToken, FLAG_AUTOPILOT, ROLE_CONTROLLER, ROLE_SUPERVISOR
+from roboprotocol import packReliable, COMMAND_SAFE, COMMAND_FULL, COMMAND_NOTE
+from roboprotocol import ROLE_VIEWER, TELEMETRY_ROLES, TelemetryReader, describeTelemetry
+
 # These should agree with the values in the server script!
 #host = '192.168.2.2'
 #host = '137.113.118.162'
 host = '192.168.87.32'
 port = 20000
 
+# Send control frames as UDP datagrams, so a lost frame never delays a newer one.
+# Reliable commands (see COMMAND_BUTTONS) always go over the TCP connection.
+USE_UDP = True
+
+# ROLE_CONTROLLER, or ROLE_SUPERVISOR to take control away from other clients
+ROLE = ROLE_CONTROLLER
+
+# Joystick samples per second
+SAMPLE_HZ = 50
+
+# Seconds between frames when the axes don't change; keep this well under the
+# server's DEADMAN_MSEC
+HEARTBEAT = .2
+
+# Seconds between status lines
+REPORT_PERIOD = 1
+
 # Index of base axis of controller
 AXIS1 = 0
 AXIS2 = 1
@@ -54,6 +78,13 @@ AXIS4_THRESHOLD = 0.05
 # Index of autopilot button
 AUTOPILOT_BUTTON = 0
 
+# Reliable command, and its arguments, sent once each time a button is pressed
+COMMAND_BUTTONS = {
+    1: (COMMAND_SAFE,),
+    2: (COMMAND_FULL,),
+    3: (COMMAND_NOTE, 69, 16), # A4 for a quarter second
+    }
+
 # Connect to the server over a socket
 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 try:
@@ -64,6 +95,42 @@ except socket.error as error:
 
 print('Connected to ' + host + ':' + str(port))
 
+# Don't hold small frames back waiting to fill a packet
+sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+# Tell the server we want to drive; a ROLE_SUPERVISOR would take over from other controllers
+# Our datagrams carry this token, so the server can tell them from anyone else's
+token = newToken()
+
+sock.sendall(packHello(ROLE, token))
+
+# The newest telemetry snapshot from the server, for viewers and supervisors
+telemetry = None
+
+def readTelemetry(sock):
+    global telemetry
+    reader = TelemetryReader()
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            print('Server closed the connection')
+            break
+        frames = reader.feed(data)
+        if frames:
+            telemetry = frames[-1][2]
+
+if ROLE in TELEMETRY_ROLES:
+    threading.Thread(target=readTelemetry, args=(sock,), daemon=True).start()
+
+# A viewer just watches the robot's sensors
+while ROLE == ROLE_VIEWER:
+    time.sleep(REPORT_PERIOD)
+    if telemetry is not None:
+        print(describeTelemetry(telemetry))
+
+if USE_UDP:
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
 # Set up the joystick
 pygame.joystick.init()
 pygame.display.init()
@@ -78,8 +145,40 @@ except:
 # Start with autopilot off
 autopilot = False
 
+# Lets the server spot lost or reordered frames
+sequence = 0
+
+# Reliable commands are numbered separately, since they never go to the server's LatestFrame
+command_sequence = 0
+
+# The buttons down at the last sample, so a held button sends its command once
+pressed = set()
+
+# The axes and flags last sent, and when
+sent = None
+sent_at = 0
+
+# Counts for the once-a-report status line
+samples = 0
+sends = 0
+bytes_sent = 0
+reported_at = time.monotonic()
+
+# Scheduling uses the monotonic clock, so an NTP step can't stall sampling or the heartbeat;
+# the wall clock is only for the frame timestamps
+next_sample = time.monotonic()
+
 while True:
 
+    # Sample at a fixed rate; if we fall behind, skip ahead instead of bursting
+    next_sample += 1. / SAMPLE_HZ
+    delay = next_sample - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    else:
+        next_sample = time.monotonic()
+    samples += 1
+
     # Force joystick polling
     pygame.event.pump()    
     
@@ -92,6 +191,16 @@ while True:
     #         else:
     #             autopilot = False
     
+    # Send the command for each button pressed since the last sample
+    down = set(k for k in COMMAND_BUTTONS if k < controller.get_numbuttons() and controller.get_button(k))
+    for k in sorted(down - pressed):
+        msg = packReliable(command_sequence, COMMAND_BUTTONS[k][0], COMMAND_BUTTONS[k][1:])
+        command_sequence = (command_sequence + 1) & 0xFFFF
+        sock.sendall(msg)
+        sends += 1
+        bytes_sent += len(msg)
+    pressed = down
+
     # Grab joystick axis values (forward comes in negative)
     axis_x =   controller.get_axis(AXIS1)
     axis_y =  -controller.get_axis(AXIS2)
@@ -113,10 +222,37 @@ while True:
     if (abs(r_axis_y)) < AXIS4_THRESHOLD:
         r_axis_y = 0
 
-    print('X: ' + str(axis_x) + '; Y:' + str(axis_y) + '  -  X2:' + str(r_axis_x) + '; Y2:' + str(r_axis_y))
-    # Create a fixed-length text message to send to the server
-    msg = '%+2.2f %+2.2f %d %+2.2f %+2.2f*' % (axis_x, axis_y, autopilot, r_axis_x, r_axis_y)
+    # Send when the dead-zoned axes change, and every HEARTBEAT seconds regardless,
+    # so the server's dead-man switch knows we're still here
+    axes = (axis_x, axis_y, r_axis_x, r_axis_y)
+    flags = FLAG_AUTOPILOT if autopilot else 0
+    now = time.monotonic()
+    if (axes, flags) != sent or now - sent_at >= HEARTBEAT:
+
+        # Create a fixed-length binary frame to send to the server
+        msg = packCommand(sequence, axes, flags)
+        sequence = (sequence + 1) & 0xFFFF
+
+        # Send the message over the socket
+        if USE_UDP:
+            msg = packDatagram(token, msg)
+            udp.sendto(msg, (host, port))
+        else:
+            sock.sendall(msg)
 
-    # Send the message over the socket
-    sock.send(msg.encode())
+        sent = (axes, flags)
+        sent_at = now
+        sends += 1
+        bytes_sent += len(msg)
 
+    # Print one status line per report, not one per sample
+    if now - reported_at >= REPORT_PERIOD:
+        elapsed = now - reported_at
+        print('X: %+.2f; Y: %+.2f  -  X2: %+.2f; Y2: %+.2f  |  %.0f samples/sec, %.1f sends/sec, %.0f bytes/sec' %
+              (axis_x, axis_y, r_axis_x, r_axis_y, samples / elapsed, sends / elapsed, bytes_sent / elapsed))
+        if telemetry is not None:
+            print('    ' + describeTelemetry(telemetry))
+        samples = 0
+        sends = 0
+        bytes_sent = 0
+        reported_at = now
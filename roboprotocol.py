@@ -0,0 +1,381 @@
+'''
+roboprotocol.py - Binary command frames shared by roboclient.py and roboserver.py
+
+Every command is one fixed-size, big-endian frame:
+
+    version     uint8   VERSION; a frame with any other value is skipped
+    flags       uint8   FLAG_AUTOPILOT, FLAG_RELIABLE
+    sequence    uint16  counts up from 0, wrapping at 65536
+    timestamp   uint32  sender's wall clock in msec, wrapping; for measuring latency
+    axes        4 int16 X, Y, X2, Y2, scaled from -1..+1 to -32767..+32767
+
+A frame with FLAG_RELIABLE set is a one-off command instead, such as a mode
+change or a note, that must arrive exactly once; its axes hold the command
+(COMMAND_SAFE, ...) and up to three int16 arguments.  Reliable commands are only
+sent over TCP, and the server acts on each one in order; over UDP they are ignored.
+
+A TCP client starts by sending a hello, [VERSION] [role] [token], saying
+whether it is a ROLE_CONTROLLER, a ROLE_VIEWER that only wants telemetry, or a
+ROLE_SUPERVISOR that takes control away from the controllers.  The token is a
+random uint32 the client picks with newToken(); it sends each UDP frame as a
+datagram starting with the token, so the server can tell its datagrams from
+anyone else's on the same host or behind the same NAT.  The server sends
+telemetry frames back to the roles in TELEMETRY_ROLES, which read them with a
+TelemetryReader; each frame is delta-encoded against the last one sent that client:
+
+    version     uint8   VERSION
+    sequence    uint16  counts up from 0, wrapping at 65536
+    timestamp   uint32  server's wall clock in msec, wrapping
+    changed     uint8   bit k set if TELEMETRY_FIELDS[k] follows
+    fields      the changed fields, in TELEMETRY_FIELDS order
+
+A TCP stream can deliver a frame in pieces or several frames at once, so the
+receiver uses a FrameReader to put the frames back together.  Over UDP, each
+datagram is one frame; datagrams can be lost or arrive out of order, so the
+receiver keeps only the newest frame by sequence number in a LatestFrame,
+which also works as a dead-man switch.
+
+This code is part of BreezyCreate2
+
+The MIT License
+
+Copyright (c) 2016 Simon D. Levy
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+'''
+
+import os
+import struct
+import threading
+import time
+
+VERSION = 2
+
+FLAG_AUTOPILOT = 0x01
+FLAG_RELIABLE  = 0x02
+
+# Reliable commands, and their arguments
+COMMAND_SAFE = 1    # safe mode
+COMMAND_FULL = 2    # full mode
+COMMAND_NOTE = 3    # MIDI note number, duration in 1/64 sec
+
+FRAME = struct.Struct('>BBHIhhhh')
+
+FRAME_SIZE = FRAME.size
+
+AXIS_SCALE = 32767
+
+ROLE_CONTROLLER = 1
+ROLE_VIEWER     = 2
+ROLE_SUPERVISOR = 3
+
+HELLO = struct.Struct('>BBI')
+
+# Roles the server sends telemetry to; a controller gets none, so it never has to read its socket
+TELEMETRY_ROLES = (ROLE_VIEWER, ROLE_SUPERVISOR)
+
+# Token before the frame in a UDP datagram
+DATAGRAM = struct.Struct('>I')
+
+# Telemetry fields and their formats; bumpers and cliffs are bit masks (see packBits())
+TELEMETRY_FIELDS = (
+    ('bumpers',          'B'),
+    ('cliffs',           'B'),
+    ('wall',             'H'),
+    ('voltage',          'H'),
+    ('battery_charge',   'H'),
+    ('battery_capacity', 'H'),
+    ('left_encoder',     'H'),
+    ('right_encoder',    'H'),
+    )
+
+TELEMETRY_HEADER = struct.Struct('>BHIB')
+
+# Struct for the fields present, by changed mask, so that each one is only built once
+TELEMETRY_BODIES = [struct.Struct('>' + ''.join(fmt for k, (_, fmt) in enumerate(TELEMETRY_FIELDS) if mask & (1 << k)))
+                    for mask in range(1 << len(TELEMETRY_FIELDS))]
+
+def describeTelemetry(snapshot):
+    '''
+    Returns a snapshot from a TelemetryReader as one line of name=value.
+    '''
+    return ' '.join('%s=%d' % (name, value) for (name, _), value in zip(TELEMETRY_FIELDS, snapshot))
+
+def timestampMillis():
+    '''
+    Returns the wall clock in msec, wrapped to fit a frame's timestamp.
+    '''
+    return int(time.time() * 1000) & 0xFFFFFFFF
+
+def latencyMillis(timestamp):
+    '''
+    Returns the msec since a frame's timestamp.  This only means something if the
+    sender's and receiver's clocks are synchronized (e.g., by NTP).
+    '''
+    return (timestampMillis() - timestamp) & 0xFFFFFFFF
+
+def packAxis(value):
+    return int(round(max(-1., min(1., value)) * AXIS_SCALE))
+
+def packCommand(sequence, axes, flags=0):
+    '''
+    Returns the frame for a command with the given sequence number, four axis values
+    (-1..+1), and flags.
+    '''
+    return FRAME.pack(VERSION, flags, sequence & 0xFFFF, timestampMillis(),
+                      packAxis(axes[0]), packAxis(axes[1]), packAxis(axes[2]), packAxis(axes[3]))
+
+def packReliable(sequence, command, args=()):
+    '''
+    Returns the frame for a reliable command with the given sequence number and
+    up to three int16 arguments.  Send it over TCP only.
+    '''
+    args = tuple(args) + (0,) * (3 - len(args))
+    return FRAME.pack(VERSION, FLAG_RELIABLE, sequence & 0xFFFF, timestampMillis(), command, *args)
+
+def unpackCommand(data, offset=0):
+    '''
+    Returns (flags, sequence, timestamp, axes) for the frame at offset in data.
+    For a reliable command, axes is (command, arg, arg, arg) instead.
+    '''
+    _, flags, sequence, timestamp, x, y, x2, y2 = FRAME.unpack_from(data, offset)
+    if flags & FLAG_RELIABLE:
+        return flags, sequence, timestamp, (x, y, x2, y2)
+    return flags, sequence, timestamp, (x / float(AXIS_SCALE), y / float(AXIS_SCALE),
+                                        x2 / float(AXIS_SCALE), y2 / float(AXIS_SCALE))
+
+def newToken():
+    '''
+    Returns a random token for a client to identify its datagrams with.
+    '''
+    return DATAGRAM.unpack(os.urandom(DATAGRAM.size))[0]
+
+def packHello(role, token):
+    '''
+    Returns the hello a client sends when it connects.
+    '''
+    return HELLO.pack(VERSION, role, token)
+
+def unpackHello(data):
+    '''
+    Returns (role, token) for a hello, or None if it isn't a hello we can read.
+    '''
+    version, role, token = HELLO.unpack(data)
+    if version != VERSION or role not in (ROLE_CONTROLLER, ROLE_VIEWER, ROLE_SUPERVISOR):
+        return None
+    return role, token
+
+def packBits(values):
+    bits = 0
+    for k, value in enumerate(values):
+        if value:
+            bits |= 1 << k
+    return bits
+
+def unpackBits(bits, count):
+    return tuple(bool(bits & (1 << k)) for k in range(count))
+
+def packTelemetry(sequence, snapshot, last=None):
+    '''
+    Returns the telemetry frame for a snapshot (a tuple of values in TELEMETRY_FIELDS
+    order), with just the fields that differ from last, the snapshot the receiver
+    already has; or with every field if last is None.
+    '''
+    mask = 0
+    values = []
+    for k, value in enumerate(snapshot):
+        if last is None or value != last[k]:
+            mask |= 1 << k
+            values.append(value)
+    return TELEMETRY_HEADER.pack(VERSION, sequence & 0xFFFF, timestampMillis(), mask) + TELEMETRY_BODIES[mask].pack(*values)
+
+def isNewer(sequence, latest):
+    '''
+    Returns True if sequence comes after latest, allowing for wraparound: anything
+    up to half the sequence space ahead of latest counts as newer.
+    '''
+    return 0 < ((sequence - latest) & 0xFFFF) < 0x8000
+
+def packDatagram(token, frame):
+    '''
+    Returns the UDP datagram for a frame from packCommand(), sent by the client with the given token.
+    '''
+    return DATAGRAM.pack(token) + frame
+
+def unpackDatagram(data):
+    '''
+    Returns (token, command) for a UDP datagram, or None if it isn't one we can read
+    or carries a reliable command, which only TCP may.
+    '''
+    if len(data) != DATAGRAM.size + FRAME_SIZE or data[DATAGRAM.size] != VERSION or data[DATAGRAM.size+1] & FLAG_RELIABLE:
+        return None
+    return DATAGRAM.unpack_from(data)[0], unpackCommand(data, DATAGRAM.size)
+
+class FrameReader(object):
+    '''
+    Reassembles the command frames arriving on a stream socket.
+    '''
+
+    def __init__(self, sock=None, bufsize=4096):
+
+        self.sock = sock
+        self.bufsize = bufsize
+        self.pending = bytearray()
+        self.frames = 0
+        self.skipped = 0
+
+    def recv(self):
+        '''
+        Waits for data on the socket, and returns a list of the complete frames
+        received (possibly empty), or None if the other end has closed it.
+        A partial frame is kept until the rest of it arrives.
+        '''
+        data = self.sock.recv(self.bufsize)
+        if not data:
+            return None
+        return self.feed(data)
+
+    def feed(self, data):
+        '''
+        Adds data received some other way, and returns a list of the frames it completed.
+        '''
+        pending = self.pending
+        pending += data
+        frames = []
+        start = 0
+        while len(pending) - start >= FRAME_SIZE:
+            # Anything that doesn't start with our version isn't a frame we can read; resync a byte later
+            if pending[start] != VERSION:
+                start += 1
+                self.skipped += 1
+                continue
+            frames.append(unpackCommand(pending, start))
+            start += FRAME_SIZE
+        del pending[:start]
+        self.frames += len(frames)
+        return frames
+
+class TelemetryReader(object):
+    '''
+    Reassembles the telemetry frames arriving on a stream socket, and applies each
+    one to the snapshot built from the frames before it.
+    '''
+
+    def __init__(self):
+
+        self.pending = bytearray()
+        self.snapshot = [0] * len(TELEMETRY_FIELDS)
+        self.frames = 0
+
+    def feed(self, data):
+        '''
+        Adds data from the socket, and returns a list of (sequence, timestamp, snapshot)
+        for the frames it completed, where snapshot is a tuple of every field value.
+        '''
+        pending = self.pending
+        pending += data
+        frames = []
+        start = 0
+        while len(pending) - start >= TELEMETRY_HEADER.size:
+            version, sequence, timestamp, mask = TELEMETRY_HEADER.unpack_from(pending, start)
+            if version != VERSION:
+                raise ValueError('Telemetry frame version %d; expected %d' % (version, VERSION))
+            body = TELEMETRY_BODIES[mask]
+            if len(pending) - start < TELEMETRY_HEADER.size + body.size:
+                break
+            values = iter(body.unpack_from(pending, start + TELEMETRY_HEADER.size))
+            for k in range(len(self.snapshot)):
+                if mask & (1 << k):
+                    self.snapshot[k] = next(values)
+            frames.append((sequence, timestamp, tuple(self.snapshot)))
+            start += TELEMETRY_HEADER.size + body.size
+        del pending[:start]
+        self.frames += len(frames)
+        return frames
+
+class LatestFrame(object):
+    '''
+    Holds the newest command received on any channel, for the thread that drives
+    the robot.  Frames are immutable tuples, so the receiving threads hand them
+    over just by replacing the one held, and frames older than it are discarded.
+    If no frame arrives for timeout seconds, the held frame is dropped, so the
+    robot can be stopped, and the next frame is accepted whatever its sequence
+    number, in case the client was restarted.
+    '''
+
+    def __init__(self, timeout):
+
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.frame = None
+        self.received = 0
+        self.accepted = 0
+        self.stale = 0
+
+    def offer(self, frame):
+        '''
+        Keeps frame if it is newer than the one held, waking wait(); returns True if it was kept.
+        '''
+        now = time.monotonic()
+        with self.condition:
+            if self.frame is None or now - self.received > self.timeout or isNewer(frame[1], self.frame[1]):
+                self.frame = frame
+                self.received = now
+                self.accepted += 1
+                self.condition.notify_all()
+                return True
+            self.stale += 1
+            return False
+
+    def get(self):
+        '''
+        Returns the newest frame, or None if there is none within the timeout.
+        '''
+        with self.condition:
+            if self.frame is None or time.monotonic() - self.received > self.timeout:
+                return None
+            return self.frame
+
+    def clear(self):
+        '''
+        Drops the held frame, waking wait() as if it had timed out; for when another
+        client takes control.
+        '''
+        with self.condition:
+            self.frame = None
+            self.accepted += 1
+            self.condition.notify_all()
+
+    def wait(self, seen):
+        '''
+        Sleeps until a frame arrives after the seen'th one, or the held frame times out.
+        Returns (count, frame), where count is the number of frames accepted so far and
+        frame is None if it timed out.  Once it has timed out, waits for a new frame.
+        '''
+        with self.condition:
+            while self.accepted == seen:
+                if self.frame is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.received + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.frame = None
+                    return self.accepted, None
+                self.condition.wait(remaining)
+            return self.accepted, self.frame
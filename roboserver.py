@@ -5,7 +5,15 @@ robotserver.py
 
 Serves a socket that accepts <X,Y,A> tuples from a client's joystick.
 
-X,Y are control axes (-1..+1); A is autopilot flag (0 or 1).
+X,Y are control axes (-1..+1); A is autopilot flag (0 or 1).  They arrive as
+the binary frames described in roboprotocol.py.
+
+Any number of clients can connect.  Controllers and a supervisor send commands,
+but only the active one (a supervisor if one is connected, otherwise the first
+controller) drives the robot, and only its reliable commands (mode changes,
+notes) are carried out.  Viewers and supervisors (TELEMETRY_ROLES) get sensor
+telemetry: bumpers, cliffs, wall, battery, and wheel encoders, sending only
+what changed since that client's last frame.  Controllers get none.
 
 This code is part of BreezyCreate2
 
@@ -33,9 +41,14 @@ THE SOFTWARE.
 '''
 
 from breezycreate2 import Robot
+from roboprotocol import FrameReader, LatestFrame, unpackDatagram, unpackHello, packTelemetry, packBits, latencyMillis
+from roboprotocol import HELLO, ROLE_CONTROLLER, ROLE_VIEWER, ROLE_SUPERVISOR, TELEMETRY_ROLES
+from roboprotocol import FLAG_RELIABLE, COMMAND_SAFE, COMMAND_FULL, COMMAND_NOTE
 from time import sleep
-import socket
+import asyncio
+import queue
 import threading
+import time
 # import RPi.GPIO as GPIO
 import os
 
@@ -43,6 +56,16 @@ import os
 HOST        = '192.168.87.29'
 PORT        = 20000
 BUFSIZE     = 100
+LATENCY_REPORT_FRAMES = 500
+USE_UDP     = True  # also accept control frames as datagrams on PORT
+DEADMAN_MSEC = 500  # stop the robot when no control frame arrives for this long
+TELEMETRY_PERIOD = .05  # seconds between telemetry frames
+TELEMETRY_BUFFER = 1024 # bytes queued to a client before we drop its telemetry
+TELEMETRY_KEEPALIVE = 1 # seconds after which a client gets a frame even if nothing changed
+
+# Packets the robot streams: the ones Robot.get...() reads, plus voltage, battery charge
+# and capacity, and the wheel encoders
+TELEMETRY_PACKETS = (7, 9, 10, 11, 12, 27, 22, 25, 26, 43, 44)
 servoPIN_X  = 17
 servoPIN_Y  = 18
 PX_MAX      = 12.8
@@ -67,6 +90,8 @@ MOTOR_MAX_FORWARD_SPEED     = 350
 def printIP():
     os.system("hostname -I")
 
+ROLE_NAMES = {ROLE_CONTROLLER: 'controller', ROLE_VIEWER: 'viewer', ROLE_SUPERVISOR: 'supervisor'}
+
 # def attemptOffset(isX, offset):
 #     global px_duty
 #     global py_duty
@@ -106,69 +131,295 @@ def printIP():
 
 #     sleep(0.01)
 
-def threadfunc(values):
-
-    # Connect to the Create2
-    bot = Robot()
+class Drive(object):
+    '''
+    The robot's drive and mode commands, from the command-listener and reliable-command
+    threads; the lock keeps a mode change from landing in the middle of a drive command.
+    '''
+
+    def __init__(self, bot):
+
+        self.bot = bot
+        self.lock = threading.Lock()
+        # The (velocity, radius) last sent to the robot; a repeat of it is skipped
+        self.driving = (0, 32767)
+
+    def drive(self, command):
+
+        with self.lock:
+            if command != self.driving:
+                if command[1] == -1:
+                    self.bot.setTurnSpeed(command[0])
+                else:
+                    self.bot.setForwardSpeed(command[0])
+                self.driving = command
+
+    def run(self, command, args):
+
+        create2 = self.bot.robot
+        with self.lock:
+            if command == COMMAND_SAFE:
+                create2.safe()
+            elif command == COMMAND_FULL:
+                create2.full()
+            elif command == COMMAND_NOTE:
+                if not (0 <= args[0] <= 127 and 0 <= args[1] <= 255):
+                    print('Note %d for %d/64 sec ignored; out of range' % (args[0], args[1]))
+                    return
+                create2.create_song(0, [args[0], args[1]])
+                create2.play(0)
+            else:
+                print('Unknown command %d ignored' % command)
+                return
+            # A mode change can stop the wheels, so send the next drive command even if it repeats the last
+            self.driving = None
+
+def threadfunc(drive, latest):
+
+    seen = 0
     
     while True:
 
-        #Convert [-1,+1] axis to [-500,+500] turn speed
-        if abs(values[0]) > abs(values[1]):
-            # Only turn
-            bot.setTurnSpeed(MOTOR_MAX_ROTATION_SPEED*values[0])
+        # Sleep until there is a new command, or the dead-man deadline passes
+        seen, frame = latest.wait(seen)
+
+        if frame is None:
+            print('No command from the active controller; stopping')
+            command = (0, 32767)
         else:
-            bot.setForwardSpeed(MOTOR_MAX_FORWARD_SPEED*values[1])
+            values = frame[3]
 
-        # Servo control
-        # handleTurret(values[3], values[4])
+            #Convert [-1,+1] axis to [-500,+500] turn speed
+            if abs(values[0]) > abs(values[1]):
+                # Only turn
+                command = (int(MOTOR_MAX_ROTATION_SPEED*values[0]), -1)
+            else:
+                command = (int(MOTOR_MAX_FORWARD_SPEED*values[1]), 32767)
 
-        # Yield to main thread
-        sleep(.01)
-        
-if __name__ == '__main__':
-    printIP()
-    # Listen for a client ------------------------------------------------------
+            # Servo control
+            # handleTurret(values[2], values[3])
 
-    exit(1) # for servo controller test
-    
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        drive.drive(command)
 
+def commandfunc(drive, commands):
+
+    # Reliable commands block (a mode change waits for the robot), so they get their own thread
+    while True:
+        values = commands.get()
+        # One bad command mustn't stop the ones queued behind it
+        try:
+            drive.run(values[0], values[1:])
+        except Exception as error:
+            print('Command %d failed: %s' % (values[0], error))
+
+class Client(object):
+    '''
+    A connected client, with its role, the token on its datagrams, and the stream
+    to send it telemetry on.
+    '''
+
+    def __init__(self, role, token, writer):
+
+        self.role = role
+        self.token = token
+        self.writer = writer
+        self.host = writer.get_extra_info('peername')[0]
+        self.dropped = 0
+        # The snapshot this client last got, which the next frame is a delta from
+        self.last = None
+        self.sent_at = 0
+
+    def send(self, sequence, snapshot, now):
+        '''
+        Sends the fields of a telemetry snapshot that changed since the last one this
+        client got.  If the client isn't keeping up, the snapshot is dropped instead,
+        so that a slow client never holds up the others or the control path, and its
+        next frame brings it straight to the newest values.
+        '''
+        if snapshot == self.last and now - self.sent_at < TELEMETRY_KEEPALIVE:
+            return
+        if self.writer.transport.get_write_buffer_size() > TELEMETRY_BUFFER:
+            self.dropped += 1
+            return
+        self.writer.write(packTelemetry(sequence, snapshot, self.last))
+        self.last = snapshot
+        self.sent_at = now
+
+class Arbiter(object):
+    '''
+    Decides which client's commands reach the drive: the most recent supervisor
+    if there is one, otherwise the controller that has been connected longest.
+    '''
+
+    def __init__(self, latest):
+
+        self.latest = latest
+        self.clients = []
+        self.active = None
+
+    def join(self, client):
+        self.clients.append(client)
+        self.update()
+
+    def leave(self, client):
+        self.clients.remove(client)
+        self.update()
+
+    def update(self):
+
+        supervisors = [client for client in self.clients if client.role == ROLE_SUPERVISOR]
+        controllers = [client for client in self.clients if client.role == ROLE_CONTROLLER]
+        active = supervisors[-1] if supervisors else controllers[0] if controllers else None
+
+        if active is not self.active:
+            self.active = active
+            # The new controller has its own sequence numbers, and nothing from the old one still applies
+            self.latest.clear()
+            print('Control ' + ('given to %s' % active.host if active is not None else 'released'))
+
+async def serveClient(reader, writer, arbiter, latest, commands):
+
+    try:
+        hello = unpackHello(await reader.readexactly(HELLO.size))
+    except asyncio.IncompleteReadError:
+        hello = None
+    if hello is None:
+        writer.close()
+        return
+
+    role, token = hello
+    client = Client(role, token, writer)
+    arbiter.join(client)
+    print('Accepted %s from %s' % (ROLE_NAMES[role], client.host))
+
+    # Get command frames from the client and share the newest one with the
+    # command listener, and queue its reliable commands, as long as this client is in control
+    frames = FrameReader()
+    reported = 0
     try:
-        sock.bind((HOST, PORT)) # Note tuple!
+        while True:
+
+            data = await reader.read(BUFSIZE)
+
+            if not data:
+                break
+
+            for frame in frames.feed(data):
+                if client is not arbiter.active:
+                    continue
+                if frame[0] & FLAG_RELIABLE:
+                    commands.put(frame[3])
+                else:
+                    latest.offer(frame)
+
+            frame = latest.get()
+            if frame is not None and latest.accepted - reported >= LATENCY_REPORT_FRAMES:
+                reported = latest.accepted
+                print('Frame %d latency: %d msec, %d stale frames dropped' % (frame[1], latencyMillis(frame[2]), latest.stale))
+
+    except ConnectionError:
+        pass
+
+    finally:
+        arbiter.leave(client)
+        writer.close()
+        print('%s %s disconnected' % (ROLE_NAMES[role], client.host))
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+    '''
+    Control frames as UDP datagrams.  Only datagrams carrying the active controller's
+    token, from its host, are listened to; late and duplicate frames are dropped by latest,
+    and reliable commands, which must come over TCP, by unpackDatagram().
+    '''
+
+    def __init__(self, arbiter, latest):
+
+        self.arbiter = arbiter
+        self.latest = latest
+
+    def datagram_received(self, data, address):
+
+        active = self.arbiter.active
+        if active is None or address[0] != active.host:
+            return
+        datagram = unpackDatagram(data)
+        if datagram is not None and datagram[0] == active.token:
+            self.latest.offer(datagram[1])
+
+def sensorSnapshot(bot):
+
+    # The robot streams its sensors, so reading them here doesn't touch the serial port
+    create2 = bot.robot
+    with create2.sensor_lock:
+        sensors = create2.sensor_state
+        return (packBits((sensors.bump_left, sensors.bump_right)),
+                packBits((sensors.cliff_left, sensors.cliff_front_left, sensors.cliff_front_right, sensors.cliff_right)),
+                sensors.wall_signal,
+                sensors.voltage,
+                sensors.battery_charge,
+                sensors.battery_capacity,
+                sensors.left_encoder_counts,
+                sensors.right_encoder_counts)
+
+async def telemetry(bot, arbiter):
+
+    # One snapshot per period, shared by every viewer and supervisor, so they add no serial traffic
+    sequence = 0
+    while True:
+        await asyncio.sleep(TELEMETRY_PERIOD)
+        subscribers = [client for client in arbiter.clients if client.role in TELEMETRY_ROLES]
+        if subscribers:
+            snapshot = sensorSnapshot(bot)
+            now = time.monotonic()
+            for client in subscribers:
+                client.send(sequence, snapshot, now)
+            sequence = (sequence + 1) & 0xFFFF
 
-    except socket.error as error:
+async def serve(bot, latest, commands):
+
+    arbiter = Arbiter(latest)
+    loop = asyncio.get_running_loop()
+
+    try:
+        server = await asyncio.start_server(lambda reader, writer: serveClient(reader, writer, arbiter, latest, commands), HOST, PORT)
+        if USE_UDP:
+            await loop.create_datagram_endpoint(lambda: DatagramProtocol(arbiter, latest), local_addr=(HOST, PORT))
+
+    except OSError as error:
        print('bind() failed on ' + HOST + ':' + str(PORT) + ' ' + str(error))
        exit(1)
 
-    print('Waiting for a client ...')
+    print('Waiting for clients ...')
+
+    loop.create_task(telemetry(bot, arbiter))
+
+    async with server:
+        await server.serve_forever()
+        
+if __name__ == '__main__':
+    printIP()
+    # Listen for clients -------------------------------------------------------
 
-    sock.listen(1)  # handle up to 1 back-logged connection
+    exit(1) # for servo controller test
 
-    client, address = sock.accept()
+    # Connect to the Create2, and have it stream the sensors we send as telemetry
+    bot = Robot()
+    bot.startStream(TELEMETRY_PACKETS)
 
-    print('Accepted connection')
+    # The newest command from the active controller will be shared with the command-listener thread
+    latest = LatestFrame(DEADMAN_MSEC / 1000.)
 
-    # These values will be shared with the command-listener thread
-    values = [0,0,0,0,0]
+    # Reliable commands from the active controller, in the order they arrived
+    commands = queue.Queue()
 
-    # Launch command listener on another thread
-    thread = threading.Thread(target=threadfunc, args = (values,))
+    # Launch command listener on another thread, so serial writes never hold up the network
+    drive = Drive(bot)
+    thread = threading.Thread(target=threadfunc, args = (drive, latest))
     thread.daemon = True
     thread.start()
 
-    # Loop forever, getting <X,Y,A> tuples from the client and sharing them with
-    # the command listener
-    while True:
+    thread = threading.Thread(target=commandfunc, args = (drive, commands))
+    thread.daemon = True
+    thread.start()
 
-        msg = ''
-
-        messages = client.recv(BUFSIZE).decode().split('*')
-        for message in messages:
-            parts = message.split()
-            if len(parts) == 5:
-                values[0] = float(parts[0])
-                values[1] = float(parts[1])
-                values[2] = int(parts[2])
-                values[3] = float(parts[3])
-                values[4] = float(parts[4])
+    asyncio.run(serve(bot, latest, commands))
@@ -32,7 +32,7 @@ from distutils.core import setup
 
 
 setup (name = 'BreezyCreate2',
-        packages = ['breezycreate2'],
+        packages = ['breezycreate2', 'breezycreate2.servos'],
         package_data={'breezycreate2' : ['config.json']},
         version = '0.1',
         description = 'Simple API for iRobot Create2',